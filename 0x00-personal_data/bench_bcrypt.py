@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+This module benchmarks bcrypt password hashing on the current machine.
+"""
+
+import asyncio
+import sys
+import time
+
+import encrypt_password
+from password_executor import get_executor
+
+
+def print_cost_table(max_rounds: int) -> None:
+    """
+    Prints the hash latency of every cost factor up to max_rounds.
+
+    Args:
+        max_rounds (int): The highest cost factor to measure.
+    """
+    print("{:>6}{:>14}".format("cost", "latency (ms)"))
+    for rounds, seconds in encrypt_password.cost_table(
+            max_rounds=max_rounds):
+        print("{:>6}{:>14.1f}".format(rounds, seconds * 1000))
+
+
+def print_offload(count: int) -> None:
+    """
+    Compares inline verification with the shared executor.
+
+    Args:
+        count (int): The number of passwords to verify.
+    """
+    hashed = encrypt_password.hash_password("password")
+    start = time.perf_counter()
+    for _ in range(count):
+        encrypt_password.is_valid(hashed, "password")
+    print("inline:   {:.1f} checks/sec".format(
+        count / (time.perf_counter() - start)))
+
+    async def verify_all() -> None:
+        """Verifies the password count times from concurrent tasks."""
+        await asyncio.gather(*(
+            encrypt_password.is_valid_async(hashed, "password")
+            for _ in range(count)))
+
+    executor = get_executor()
+    start = time.perf_counter()
+    asyncio.run(verify_all())
+    stats = executor.stats()
+    print("executor: {:.1f} checks/sec with {} workers, avg wait {:.1f} ms, "
+          "max wait {:.1f} ms, avg hash {:.1f} ms".format(
+              count / (time.perf_counter() - start), executor.max_workers,
+              stats["avg_wait_time"] * 1000, stats["max_wait_time"] * 1000,
+              stats["avg_run_time"] * 1000))
+
+
+def print_batch(count: int) -> None:
+    """
+    Compares the process and thread modes of verify_many.
+
+    Args:
+        count (int): The number of pairs to verify in each mode.
+    """
+    hashed = encrypt_password.hash_password("password")
+    pairs = [(hashed, "password")] * count
+    for mode in ("process", "thread"):
+        start = time.perf_counter()
+        assert all(encrypt_password.verify_many(pairs, mode=mode))
+        print("verify_many ({}): {:.1f} checks/sec".format(
+            mode, count / (time.perf_counter() - start)))
+
+
+def main() -> None:
+    """
+    Prints the cost/latency table, the calibrated cost factor and
+    the executor and batch throughput at that cost.
+    """
+    max_rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 14
+    print_cost_table(max_rounds)
+    target = encrypt_password.TARGET_LATENCY
+    print("calibrated cost for {:.0f} ms: {}".format(
+        target * 1000, encrypt_password.calibrate(target)))
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print_offload(count)
+    print_batch(count)
+
+
+if __name__ == "__main__":
+    main()
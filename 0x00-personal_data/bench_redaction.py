@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+This module benchmarks log redaction throughput on messages
+shaped like the rows of user_data.csv.
+"""
+
+import csv
+import os
+import re
+import sys
+import time
+from typing import Callable, List
+
+from filtered_logger import PII_FIELDS, RedactingFormatter, filter_datum, \
+    patterns
+
+
+CSV_FILE = os.path.join(os.path.dirname(__file__), "user_data.csv")
+
+
+def load_messages(count: int) -> List[str]:
+    """
+    Builds log messages from user_data.csv the way main() builds them.
+
+    Args:
+        count (int): The number of messages to produce.
+
+    Returns:
+        List[str]: The messages, cycling through the CSV rows.
+    """
+    with open(CSV_FILE, newline='') as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        rows = [
+            '{};'.format('; '.join(
+                '{}={}'.format(k, v) for k, v in zip(columns, row)))
+            for row in reader
+        ]
+    return [rows[i % len(rows)] for i in range(count)]
+
+
+def synthetic_messages(n_fields: int, count: int) -> List[str]:
+    """
+    Builds key=value messages with PII fields spread among other keys.
+
+    Args:
+        n_fields (int): The number of fields per message.
+        count (int): The number of messages to produce.
+
+    Returns:
+        List[str]: The messages.
+    """
+    keys = [
+        PII_FIELDS[i // 8 % len(PII_FIELDS)] if i % 8 == 0
+        else "attr_{}".format(i) for i in range(n_fields)
+    ]
+    return [
+        '{};'.format('; '.join(
+            '{}=value {} {}'.format(k, i, j) for j, k in enumerate(keys)))
+        for i in range(count)
+    ]
+
+
+def uncached_filter_datum(
+        fields: List[str], redaction: str, message: str, separator: str,
+) -> str:
+    """
+    Filters a message by rebuilding the pattern on every call.
+
+    Args:
+        fields (List[str]): A list of fields to be filtered.
+        redaction (str): The string to replace the sensitive data.
+        message (str): The log message to be filtered.
+        separator (str): The field separator in the log message.
+
+    Returns:
+        str: The filtered log message.
+    """
+    extract, replace = (patterns["extract"], patterns["replace"])
+    return re.sub(extract(fields, separator), replace(redaction), message)
+
+
+def lines_per_sec(redact: Callable[[str], str], messages: List[str]) -> float:
+    """
+    Measures how many messages a redaction function handles per second.
+
+    Args:
+        redact (Callable[[str], str]): The redaction function.
+        messages (List[str]): The messages to redact.
+
+    Returns:
+        float: The throughput in lines per second.
+    """
+    start = time.perf_counter()
+    for message in messages:
+        redact(message)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """
+    Prints lines/sec for each redaction path.
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    sep, redaction = RedactingFormatter.SEPARATOR, RedactingFormatter.REDACTION
+    workloads = {
+        "user_data.csv": load_messages(count),
+        "8 fields": synthetic_messages(8, count),
+        "80 fields": synthetic_messages(80, count // 10),
+    }
+    candidates = {
+        "before (pattern per line)": lambda m: uncached_filter_datum(
+            PII_FIELDS, redaction, m, sep),
+        "filter_datum (cached)": lambda m: filter_datum(
+            PII_FIELDS, redaction, m, sep),
+        "regex Redactor": RedactingFormatter(PII_FIELDS).redactor.redact,
+        "token Redactor": RedactingFormatter(
+            PII_FIELDS, backend="token").redactor.redact,
+    }
+    for workload, messages in workloads.items():
+        print("{} ({} messages)".format(workload, len(messages)))
+        for name, redact in candidates.items():
+            print("  {:<28}{:>14,.0f} lines/sec".format(
+                name, lines_per_sec(redact, messages)))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,106 @@ Bcrypt is a strong and secure password hashing algorithm
 that helps protect user passwords.
 """
 
+import os
+import time
 import bcrypt
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, \
+    ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Tuple, Union
+
+from password_executor import get_executor
+
+
+MIN_ROUNDS = 4
+MAX_ROUNDS = 16
+BATCH_CHUNK_SIZE = 16
+TARGET_LATENCY = float(os.getenv("BCRYPT_TARGET_LATENCY", "0.25"))
+ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+
+def hash_time(rounds: int, samples: int = 3) -> float:
+    """
+    Measures how long hashing a password takes on this machine.
+
+    Args:
+        rounds (int): The bcrypt cost factor to measure.
+        samples (int): The number of hashes to time.
+
+    Returns:
+        float: The fastest of the timed hashes, in seconds.
+    """
+    salt = bcrypt.gensalt(rounds)
+    best = float("inf")
+    for _ in range(samples):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration password", salt)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def cost_table(
+        min_rounds: int = MIN_ROUNDS, max_rounds: int = MAX_ROUNDS,
+        samples: int = 3,
+) -> List[Tuple[int, float]]:
+    """
+    Measures the hash latency of a range of cost factors.
+
+    Args:
+        min_rounds (int): The lowest cost factor to measure.
+        max_rounds (int): The highest cost factor to measure.
+        samples (int): The number of hashes to time per cost factor.
+
+    Returns:
+        List[Tuple[int, float]]: The (cost, seconds) pairs.
+    """
+    return [(rounds, hash_time(rounds, samples))
+            for rounds in range(min_rounds, max_rounds + 1)]
+
+
+def calibrate(target_latency: float = TARGET_LATENCY) -> int:
+    """
+    Picks the highest cost factor that hashes within a target latency.
+
+    Costs are measured from MIN_ROUNDS upwards and the search stops at
+    the first one over target, since each extra round doubles the time.
+    The result becomes the ROUNDS used by hash_password.
+
+    Args:
+        target_latency (float): The hash time budget, in seconds.
+
+    Returns:
+        int: The selected cost factor.
+    """
+    global ROUNDS
+    rounds = MIN_ROUNDS
+    while rounds < MAX_ROUNDS and hash_time(rounds + 1) <= target_latency:
+        rounds += 1
+    ROUNDS = rounds
+    return rounds
+
+
+def needs_rehash(hashed_password: Union[bytes, str]) -> bool:
+    """
+    Tells whether a hash was made with a cost other than ROUNDS.
+
+    Callers can rehash the password after a successful is_valid to
+    move stored hashes to the current cost transparently.
+
+    Args:
+        hashed_password (Union[bytes, str]): The previously hashed
+            password, as bytes or as the str a database may return.
+
+    Returns:
+        bool: True if the hash should be recomputed, False otherwise.
+    """
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode('utf-8', 'surrogatepass')
+    try:
+        return int(hashed_password.split(b'$')[2]) != ROUNDS
+    except (AttributeError, IndexError, TypeError, ValueError):
+        return True
 
 
 def hash_password(password: str) -> bytes:
@@ -20,7 +119,7 @@ def hash_password(password: str) -> bytes:
         bytes: The salted and hashed password.
     """
     if password is not None and isinstance(password, str):
-        return bcrypt.hashpw(bytes(password, 'utf-8'), bcrypt.gensalt())
+        return bcrypt.hashpw(bytes(password, 'utf-8'), bcrypt.gensalt(ROUNDS))
 
 
 def is_valid(hashed_password: bytes, password: str) -> bool:
@@ -39,22 +138,139 @@ def is_valid(hashed_password: bytes, password: str) -> bool:
     return False
 
 
+def _verify_chunk(pairs: List[Tuple[bytes, str]]) -> List[bool]:
+    """
+    Validates a chunk of passwords inside a batch worker.
+
+    Args:
+        pairs (List[Tuple[bytes, str]]): The (hashed password, password)
+            pairs to validate.
+
+    Returns:
+        List[bool]: The validation results, in order.
+    """
+    return [is_valid(hashed_password, password)
+            for hashed_password, password in pairs]
+
+
+def verify_many(
+        pairs: Iterable[Tuple[bytes, str]], mode: str = "process",
+        workers: int = None, chunk_size: int = BATCH_CHUNK_SIZE,
+        progress: Callable[[int], None] = None,
+) -> Iterator[bool]:
+    """
+    Validates many passwords across a pool, streaming results in order.
+
+    The pairs are consumed lazily in chunks and only a few chunks per
+    worker are in flight, so arbitrarily long iterables are supported.
+    Bcrypt releases the GIL, so the "thread" mode scales across cores
+    too while avoiding the cost of pickling chunks to processes.
+
+    Args:
+        pairs (Iterable[Tuple[bytes, str]]): The (hashed password,
+            password) pairs to validate.
+        mode (str): "process" or "thread".
+        workers (int): The pool size, defaults to the number of CPUs.
+        chunk_size (int): The number of pairs sent to a worker at once.
+        progress (Callable[[int], None]): Called with the number of
+            pairs validated so far after every chunk.
+
+    Yields:
+        bool: True if the password is valid, False otherwise.
+    """
+    pools = {"process": ProcessPoolExecutor, "thread": ThreadPoolExecutor}
+    if mode not in pools:
+        raise ValueError("Unknown batch mode: {}".format(mode))
+    workers = workers or os.cpu_count() or 1
+    pairs = iter(pairs)
+    done = 0
+    with pools[mode](workers) as pool:
+        pending = deque()
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = list(islice(pairs, chunk_size))
+                if not chunk:
+                    break
+                pending.append(pool.submit(_verify_chunk, chunk))
+            if not pending:
+                return
+            results = pending.popleft().result()
+            done += len(results)
+            if progress is not None:
+                progress(done)
+            yield from results
+
+
+def hash_password_future(password: str) -> Future:
+    """
+    Hashes a password on the shared password executor.
+
+    Args:
+        password (str): The password to be hashed.
+
+    Returns:
+        Future: The future salted and hashed password.
+    """
+    return get_executor().submit(hash_password, password)
+
+
+def is_valid_future(hashed_password: bytes, password: str) -> Future:
+    """
+    Validates a password on the shared password executor.
+
+    Args:
+        hashed_password (bytes): The previously hashed password.
+        password (str): The password to be validated.
+
+    Returns:
+        Future: The future validation result.
+    """
+    return get_executor().submit(is_valid, hashed_password, password)
+
+
+async def hash_password_async(password: str) -> bytes:
+    """
+    Hashes a password without blocking the running event loop.
+
+    Args:
+        password (str): The password to be hashed.
+
+    Returns:
+        bytes: The salted and hashed password.
+    """
+    return await get_executor().run(hash_password, password)
+
+
+async def is_valid_async(hashed_password: bytes, password: str) -> bool:
+    """
+    Validates a password without blocking the running event loop.
+
+    Args:
+        hashed_password (bytes): The previously hashed password.
+        password (str): The password to be validated.
+
+    Returns:
+        bool: True if the password is valid, False otherwise.
+    """
+    return await get_executor().run(is_valid, hashed_password, password)
+
+
 if __name__ == '__main__':
     """
     Tests the functionality of the password hashing and validation.
     """
     pwd = 'This is some text'
     print('Password: [{}]\nHashed Password: {}'.format(pwd, hash_password(pwd)))
-    print('Is Valid: {}\n'.format(is_valid(hash_password(pwd), pwd))
+    print('Is Valid: {}\n'.format(is_valid(hash_password(pwd), pwd)))
 
     pwd = '1 l0v3 7h3 w1ld!'
     print('Password: [{}]\nHashed Password: {}'.format(pwd, hash_password(pwd)))
-    print('Is Valid: {}\n'.format(is_valid(hash_password(pwd), pwd))
+    print('Is Valid: {}\n'.format(is_valid(hash_password(pwd), pwd)))
 
     pwd = ''
     print('Password: [{}]\nHashed Password: {}'.format(pwd, hash_password(pwd)))
-    print('Is Valid: {}\n'.format(is_valid(hash_password(pwd), pwd))
+    print('Is Valid: {}\n'.format(is_valid(hash_password(pwd), pwd)))
 
     pwd = '2'
     print('Password: [{}]\nHashed Password: {}'.format(pwd, hash_password(pwd)))
-    print('Is Valid: {}'.format(is_valid(hash_password(pwd), pwd))
+    print('Is Valid: {}'.format(is_valid(hash_password(pwd), pwd)))
@@ -6,9 +6,20 @@ and logs user data.
 
 import os
 import re
+import sys
+import time
 import logging
-import mysql.connector
-from typing import List
+import queue
+import sqlite3
+from contextlib import closing
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Pattern, Tuple, Union
+
+try:
+    import mysql.connector
+except ImportError:
+    mysql = None
 
 
 patterns = {
@@ -16,6 +27,158 @@ patterns = {
     'replace': lambda x: r'\g<field>={}'.format(x),
 }
 PII_FIELDS = ("name", "email", "phone", "ssn", "password")
+REDACTOR_CACHE_SIZE = 32
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_QUEUE_SIZE = 10000
+
+
+class Redactor:
+    """
+    Compiled redaction engine for a fixed set of fields.
+
+    The extraction pattern is built and compiled once, so redacting a
+    message costs a single substitution pass instead of a pattern
+    rebuild per log line.
+    """
+
+    def __init__(self, fields: Tuple[str, ...], redaction: str,
+                 separator: str):
+        """
+        Initializes a redactor.
+
+        Args:
+            fields (Tuple[str, ...]): The fields to be filtered.
+            redaction (str): The string to replace the sensitive data.
+            separator (str): The field separator in the log messages.
+        """
+        self.fields = tuple(fields)
+        self.redaction = redaction
+        self.separator = separator
+        self.pattern: Pattern = re.compile(
+            patterns["extract"](self.fields, separator))
+        self.replacement = patterns["replace"](redaction)
+
+    def redact(self, message: str) -> str:
+        """
+        Filters sensitive data in a log message.
+
+        Args:
+            message (str): The log message to be filtered.
+
+        Returns:
+            str: The filtered log message.
+        """
+        return self.pattern.sub(self.replacement, message)
+
+
+class TokenRedactor:
+    """
+    Single-pass, regex-free redaction engine for key=value messages.
+
+    The message is split on the separator once and, in each token, the
+    first '=' preceded by a field name has everything after it
+    replaced, which is what Redactor's pattern does: a field is matched
+    wherever it ends right before an '=', including as the tail of a
+    longer key ("username=") or after another '=' ("x=name=").
+    Equivalence only holds for plain word fields, a single-character
+    separator and a redaction without backslashes; for anything else
+    the messages are handed to a Redactor.
+    """
+
+    def __init__(self, fields: Tuple[str, ...], redaction: str,
+                 separator: str):
+        """
+        Initializes a redactor.
+
+        Args:
+            fields (Tuple[str, ...]): The fields to be filtered.
+            redaction (str): The string to replace the sensitive data.
+            separator (str): The field separator in the log messages.
+        """
+        self.fields = frozenset(fields)
+        self.redaction = redaction
+        self.separator = separator
+        self.lengths = sorted({len(field) for field in self.fields})
+        self.fallback = None
+        if not self.equivalent(fields, redaction, separator):
+            self.fallback = Redactor(fields, redaction, separator)
+
+    @staticmethod
+    def equivalent(fields: Tuple[str, ...], redaction: str,
+                   separator: str) -> bool:
+        """
+        Checks if token redaction gives the same output as the regex.
+
+        Args:
+            fields (Tuple[str, ...]): The fields to be filtered.
+            redaction (str): The string to replace the sensitive data.
+            separator (str): The field separator in the log messages.
+
+        Returns:
+            bool: True if the two engines agree on every message.
+        """
+        return (bool(fields) and len(separator) == 1
+                and separator not in '\\[]^-='
+                and not re.match(r'\w', separator)
+                and '\\' not in redaction
+                and all(re.fullmatch(r'\w+', field) for field in fields))
+
+    def redact(self, message: str) -> str:
+        """
+        Filters sensitive data in a log message.
+
+        Args:
+            message (str): The log message to be filtered.
+
+        Returns:
+            str: The filtered log message.
+        """
+        if self.fallback is not None:
+            return self.fallback.redact(message)
+        fields, lengths, redaction = self.fields, self.lengths, self.redaction
+        tokens = message.split(self.separator)
+        for i, token in enumerate(tokens):
+            eq = token.find('=')
+            while eq >= 0:
+                for length in lengths:
+                    if length <= eq and token[eq - length:eq] in fields:
+                        break
+                else:
+                    eq = token.find('=', eq + 1)
+                    continue
+                tokens[i] = token[:eq + 1] + redaction
+                break
+        return self.separator.join(tokens)
+
+
+REDACTION_BACKENDS = {
+    "regex": Redactor,
+    "token": TokenRedactor,
+}
+
+
+@lru_cache(maxsize=REDACTOR_CACHE_SIZE)
+def get_redactor(
+        fields: Tuple[str, ...], redaction: str, separator: str,
+        backend: str = "regex",
+) -> Union[Redactor, TokenRedactor]:
+    """
+    Returns a redactor, reusing a cached one when possible.
+
+    Args:
+        fields (Tuple[str, ...]): The fields to be filtered.
+        redaction (str): The string to replace the sensitive data.
+        separator (str): The field separator in the log messages.
+        backend (str): The redaction engine, "regex" or "token".
+
+    Returns:
+        Union[Redactor, TokenRedactor]: The redactor keyed on fields,
+        redaction, separator and backend.
+    """
+    if backend not in REDACTION_BACKENDS:
+        raise ValueError("Unknown redaction backend: {}".format(backend))
+    return REDACTION_BACKENDS[backend](fields, redaction, separator)
 
 
 def filter_datum(
@@ -33,37 +196,119 @@ def filter_datum(
     Returns:
         str: The filtered log message.
     """
-    extract, replace = (patterns["extract"], patterns["replace"])
-    return re.sub(extract(fields, separator), replace(redaction), message)
+    return get_redactor(tuple(fields), redaction, separator).redact(message)
 
 
-def get_logger() -> logging.Logger:
+def get_logger(
+        batch: bool = False, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        asynchronous: bool = False, queue_size: int = DEFAULT_QUEUE_SIZE,
+        block: bool = False,
+) -> logging.Logger:
     """
     Creates a new logger for user data with redacting formatter.
 
+    Args:
+        batch (bool): Whether to attach a BatchStreamHandler, which
+            also accepts whole batches of messages through log_batch().
+        flush_interval (float): Minimum seconds between stream flushes
+            of the batch handler.
+        asynchronous (bool): Whether to redact and write records on a
+            background thread, behind a BoundedQueueHandler.
+        queue_size (int): Maximum number of records waiting in the queue.
+        block (bool): Whether a full queue blocks the caller instead of
+            dropping the record.
+
     Returns:
         logging.Logger: The configured logger.
     """
     logger = logging.getLogger("user_data")
-    stream_handler = logging.StreamHandler()
+    if batch:
+        stream_handler = BatchStreamHandler(flush_interval=flush_interval)
+    else:
+        stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(RedactingFormatter(PII_FIELDS))
     logger.setLevel(logging.INFO)
     logger.propagate = False
-    logger.addHandler(stream_handler)
+    if asynchronous:
+        queue_handler = BoundedQueueHandler(
+            queue.Queue(maxsize=queue_size), block=block)
+        queue_handler.listener = QueueListener(
+            queue_handler.queue, stream_handler, respect_handler_level=True)
+        queue_handler.listener.start()
+        logger.addHandler(queue_handler)
+    else:
+        logger.addHandler(stream_handler)
     return logger
 
 
-def get_db() -> mysql.connector.connection.MySQLConnection:
+def log_batch(logger: logging.Logger, messages: List[str],
+              level: int = logging.INFO) -> None:
+    """
+    Logs a batch of pre-built messages in one go.
+
+    Handlers that support batches get the whole list at once, any
+    other handler receives one record per message as usual. The
+    logger's level, disabled flag and filters apply as in
+    Logger.handle(); with filters, one record is built per message and
+    the ones they keep (possibly rewritten) are written as a batch.
+
+    Args:
+        logger (logging.Logger): The logger to emit through.
+        messages (List[str]): The messages to log.
+        level (int): The level of every message.
+    """
+    if not messages or logger.disabled or not logger.isEnabledFor(level):
+        return
+    records = None
+    if logger.filters:
+        records = []
+        for msg in messages:
+            record = logging.LogRecord(
+                logger.name, level, None, None, msg, None, None)
+            kept = logger.filter(record)
+            if kept:
+                records.append(
+                    kept if isinstance(kept, logging.LogRecord) else record)
+        if not records:
+            return
+    for handler in logger.handlers:
+        if isinstance(handler, BatchStreamHandler):
+            if records is None:
+                handler.handle_batch(logger.name, level, messages)
+            else:
+                handler.handle_records(records)
+        elif records is None:
+            for msg in messages:
+                args = (logger.name, level, None, None, msg, None, None)
+                handler.handle(logging.LogRecord(*args))
+        else:
+            for record in records:
+                handler.handle(record)
+
+
+def get_db() -> "mysql.connector.connection.MySQLConnection":
     """
     Creates a connector to a database.
 
+    Setting PERSONAL_DATA_DB_DRIVER to "sqlite" opens the SQLite file
+    named by PERSONAL_DATA_DB_NAME instead, as an offline stand-in.
+
     Returns:
         mysql.connector.connection.MySQLConnection: The database connection.
+
+    Raises:
+        ImportError: If the MySQL driver is used but not installed.
     """
     db_host = os.getenv("PERSONAL_DATA_DB_HOST", "localhost")
     db_name = os.getenv("PERSONAL_DATA_DB_NAME", "")
     db_user = os.getenv("PERSONAL_DATA_DB_USERNAME", "root")
     db_pwd = os.getenv("PERSONAL_DATA_DB_PASSWORD", "")
+    if os.getenv("PERSONAL_DATA_DB_DRIVER", "mysql") == "sqlite":
+        return sqlite3.connect(db_name)
+    if mysql is None:
+        raise ImportError(
+            "mysql-connector-python is not installed; install it or set "
+            "PERSONAL_DATA_DB_DRIVER=sqlite")
     connection = mysql.connector.connect(
         host=db_host,
         port=3306,
@@ -74,27 +319,59 @@ def get_db() -> mysql.connector.connection.MySQLConnection:
     return connection
 
 
+def peak_rss_kb() -> int:
+    """
+    Returns the peak resident set size of the current process.
+
+    Returns:
+        int: The peak RSS in kilobytes, or 0 where it is unavailable.
+    """
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
 def main():
     """
     Logs user data from the database using the configured logger.
+
+    Rows are streamed from the cursor in batches of
+    PERSONAL_DATA_DB_BATCH_SIZE instead of being fetched all at once,
+    and logged a batch at a time through log_batch(). A rows/sec and
+    peak RSS summary is written to stderr at the end.
     """
     fields = "name,email,phone,ssn,password,ip,last_login,user_agent"
     columns = fields.split(',')
     query = "SELECT {} FROM users;".format(fields)
-    info_logger = get_logger()
+    batch_size = int(os.getenv("PERSONAL_DATA_DB_BATCH_SIZE",
+                               DEFAULT_BATCH_SIZE))
+    flush_interval = float(os.getenv("PERSONAL_DATA_LOG_FLUSH_INTERVAL",
+                                     DEFAULT_FLUSH_INTERVAL))
+    info_logger = get_logger(batch=True, flush_interval=flush_interval)
     connection = get_db()
-    with connection.cursor() as cursor:
+    count, start = 0, time.perf_counter()
+    with closing(connection.cursor()) as cursor:
         cursor.execute(query)
-        rows = cursor.fetchall()
-        for row in rows:
-            record = map(
-                lambda x: '{}={}'.format(x[0], x[1]),
-                zip(columns, row),
-            )
-            msg = '{};'.format('; '.join(list(record)))
-            args = ("user_data", logging.INFO, None, None, msg, None, None)
-            log_record = logging.LogRecord(*args)
-            info_logger.handle(log_record)
+        rows = cursor.fetchmany(batch_size)
+        while rows:
+            messages = [
+                '{};'.format('; '.join(
+                    '{}={}'.format(k, v) for k, v in zip(columns, row)))
+                for row in rows
+            ]
+            log_batch(info_logger, messages)
+            count += len(rows)
+            rows = cursor.fetchmany(batch_size)
+    connection.close()
+    for handler in info_logger.handlers:
+        handler.flush()
+    elapsed = time.perf_counter() - start
+    print("{} rows in {:.2f}s ({:.0f} rows/sec), peak RSS {} KB".format(
+        count, elapsed, count / elapsed if elapsed else 0, peak_rss_kb()),
+        file=sys.stderr)
 
 
 class RedactingFormatter(logging.Formatter):
@@ -107,9 +384,11 @@ class RedactingFormatter(logging.Formatter):
     FORMAT_FIELDS = ('name', 'levelname', 'asctime', 'message')
     SEPARATOR = ";"
 
-    def __init__(self, fields: List[str]):
+    def __init__(self, fields: List[str], backend: str = "regex"):
         super(RedactingFormatter, self).__init__(self.FORMAT)
         self.fields = fields
+        self.redactor = get_redactor(
+            tuple(fields), self.REDACTION, self.SEPARATOR, backend)
 
     def format(self, record: logging.LogRecord) -> str:
         """
@@ -122,8 +401,139 @@ class RedactingFormatter(logging.Formatter):
             str: The formatted log message.
         """
         msg = super(RedactingFormatter, self).format(record)
-        txt = filter_datum(self.fields, self.REDACTION, msg, self.SEPARATOR)
-        return txt
+        return self.redactor.redact(msg)
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """
+    Stream handler that writes whole batches of records at once.
+
+    A batch is formatted in one pass and written with a single write
+    call, and the stream is flushed at most once per flush_interval
+    seconds instead of after every record.
+    """
+
+    def __init__(self, stream=None,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        super(BatchStreamHandler, self).__init__(stream)
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Writes a single record, flushing only when the interval elapsed.
+
+        Args:
+            record (logging.LogRecord): The log record to be written.
+        """
+        try:
+            self._write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+    def handle_batch(self, name: str, level: int,
+                     messages: List[str]) -> None:
+        """
+        Formats and writes a batch of messages with a single write.
+
+        One LogRecord is built for the batch and reused for every
+        message, so the records share their creation time.
+
+        Args:
+            name (str): The logger name for the records.
+            level (int): The level of the records.
+            messages (List[str]): The messages to write.
+        """
+        if level < self.level:
+            return
+        record = logging.LogRecord(name, level, None, None, "", None, None)
+        lines = []
+        for msg in messages:
+            record.msg = msg
+            if self.filter(record):
+                lines.append(self.format(record))
+        if not lines:
+            return
+        try:
+            self._write(self.terminator.join(lines) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+    def handle_records(self, records: List[logging.LogRecord]) -> None:
+        """
+        Formats and writes a list of records with a single write.
+
+        Args:
+            records (List[logging.LogRecord]): The records to write.
+        """
+        lines = [self.format(record) for record in records
+                 if record.levelno >= self.level and self.filter(record)]
+        if not lines:
+            return
+        try:
+            self._write(self.terminator.join(lines) + self.terminator)
+        except Exception:
+            self.handleError(records[-1])
+
+    def _write(self, text: str) -> None:
+        """
+        Writes text to the stream and flushes it if the interval elapsed.
+
+        Args:
+            text (str): The text to write.
+        """
+        self.acquire()
+        try:
+            self.stream.write(text)
+            now = time.monotonic()
+            if now - self._last_flush >= self.flush_interval:
+                self.stream.flush()
+                self._last_flush = now
+        finally:
+            self.release()
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Queue handler feeding a bounded queue with a drop or block policy.
+
+    Records are only enqueued on the calling thread; the attached
+    QueueListener redacts and writes them on a background thread.
+    When the queue is full the record is either dropped and counted
+    in `dropped`, or the caller blocks until there is room.
+    """
+
+    def __init__(self, log_queue: queue.Queue, block: bool = False,
+                 timeout: float = None):
+        super(BoundedQueueHandler, self).__init__(log_queue)
+        self.block = block
+        self.timeout = timeout
+        self.listener = None
+        self.enqueued = 0
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """
+        Puts a record on the queue according to the full-queue policy.
+
+        Args:
+            record (logging.LogRecord): The prepared log record.
+        """
+        try:
+            self.queue.put(record, self.block, self.timeout)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        """
+        Drains the queue and stops the listener before closing.
+        """
+        if self.listener is not None:
+            self.queue.join()
+            self.listener.stop()
+            self.listener = None
+        super(BoundedQueueHandler, self).close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+""" Main 0
+
+Checks that the token redaction backend gives the same output as
+filter_datum, on user_data.csv, adversarial messages and random ones.
+"""
+import logging
+import random
+
+from bench_redaction import load_messages
+from filtered_logger import PII_FIELDS, RedactingFormatter, TokenRedactor, \
+    filter_datum
+
+ADVERSARIAL = [
+    "user_agent=curl name=bob;",
+    "username=foo;name=a=b;",
+    "x=name=foo;",
+    "name=;email=;",
+    "=name;name==bob;",
+    "nickname=a; ssn=1 2 3;first_name=b",
+    "password",
+    "phone=555;phone=556",
+    ";;name=bob;;",
+    "email=a@b.c name=x; ip=1.2.3.4",
+    "namename=x;passwordx=y;xpassword=z;",
+    "name=multi\nline;email=x\ny;",
+]
+
+
+def check(fields, redaction, message, separator):
+    """ Assert both backends agree on one message
+    """
+    expected = filter_datum(fields, redaction, message, separator)
+    redactor = TokenRedactor(tuple(fields), redaction, separator)
+    assert redactor.redact(message) == expected, (message, expected)
+
+
+def random_message(rng):
+    """ Build a message from fragments that stress field matching
+    """
+    fragments = list(PII_FIELDS) + [
+        "=", ";", " ", "user", "x", "_", "name=", "e", "mail", "\n"]
+    return "".join(rng.choice(fragments) for _ in range(rng.randint(0, 12)))
+
+
+for message in load_messages(1000) + ADVERSARIAL:
+    check(PII_FIELDS, "***", message, ";")
+
+rng = random.Random(0)
+for _ in range(100000):
+    check(PII_FIELDS, "***", random_message(rng), ";")
+
+""" Shapes the token backend hands to a Redactor """
+for fields, redaction, separator in [
+        (PII_FIELDS, "***", "; "),
+        (PII_FIELDS, "***", "a"),
+        (PII_FIELDS, "\\g<field>", ";"),
+        (("na.e",) + PII_FIELDS, "***", ";"),
+        ((), "***", ";")]:
+    assert TokenRedactor(fields, redaction, separator).fallback is not None
+    for message in ADVERSARIAL + ["nave=1;na.e=2; name=3; a=4"]:
+        check(fields, redaction, message, separator)
+
+regex = RedactingFormatter(PII_FIELDS)
+token = RedactingFormatter(PII_FIELDS, backend="token")
+for message in ADVERSARIAL:
+    record = logging.LogRecord(
+        "user_data", logging.INFO, None, None, message, None, None)
+    assert token.format(record) == regex.format(record)
+
+print(TokenRedactor(PII_FIELDS, "***", ";").redact(ADVERSARIAL[1]))
+print("OK")
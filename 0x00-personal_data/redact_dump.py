@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+This module redacts large CSV dumps of user data in parallel.
+
+The input is split into newline-aligned chunks (read through mmap for
+regular files), every chunk is turned into the same key=value messages
+main() logs and redacted with filter_datum semantics in a process pool,
+and the results are written back in input order.
+
+Usage: ./redact_dump.py user_data.csv -o redacted.txt --workers 4
+"""
+
+import argparse
+import csv
+import mmap
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+from typing import BinaryIO, Iterator, List, Tuple
+
+from filtered_logger import PII_FIELDS, RedactingFormatter, get_redactor
+
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+_columns: List[str] = []
+
+
+def init_worker(columns: List[str]) -> None:
+    """
+    Stores the CSV header in a worker process.
+
+    Args:
+        columns (List[str]): The column names of the dump.
+    """
+    global _columns
+    _columns = columns
+
+
+def redact_chunk(chunk: bytes) -> Tuple[int, bytes]:
+    """
+    Redacts a chunk of complete CSV lines.
+
+    Args:
+        chunk (bytes): The raw CSV lines.
+
+    Returns:
+        Tuple[int, bytes]: The number of rows and the redacted messages,
+        one per line.
+    """
+    redactor = get_redactor(PII_FIELDS, RedactingFormatter.REDACTION,
+                            RedactingFormatter.SEPARATOR)
+    lines = [
+        redactor.redact('{};'.format('; '.join(
+            '{}={}'.format(k, v) for k, v in zip(_columns, row))))
+        for row in csv.reader(chunk.decode('utf-8').splitlines())
+        if row
+    ]
+    if not lines:
+        return 0, b''
+    return len(lines), ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def iter_chunks(data: bytes, start: int, chunk_size: int) -> Iterator[bytes]:
+    """
+    Splits a buffer into chunks that end on a line boundary.
+
+    Args:
+        data (bytes): The buffer, usually an mmap of the input file.
+        start (int): The offset of the first byte to split.
+        chunk_size (int): The approximate size of each chunk.
+
+    Yields:
+        bytes: The successive chunks.
+    """
+    size = len(data)
+    while start < size:
+        end = data.find(b'\n', min(start + chunk_size, size))
+        end = size if end < 0 else end + 1
+        yield data[start:end]
+        start = end
+
+
+def iter_stream_chunks(stream: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    """
+    Splits a non-seekable stream into chunks that end on a line boundary.
+
+    Args:
+        stream (BinaryIO): The input stream, positioned after the header.
+        chunk_size (int): The approximate size of each chunk.
+
+    Yields:
+        bytes: The successive chunks.
+    """
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk + stream.readline()
+
+
+def redact_dump(source: BinaryIO, output: BinaryIO, workers: int,
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[int, int]:
+    """
+    Redacts a CSV dump, keeping the rows in input order.
+
+    Args:
+        source (BinaryIO): The CSV input, starting with its header line.
+        output (BinaryIO): Where to write the redacted messages.
+        workers (int): The number of processes, 1 redacts in-process.
+        chunk_size (int): The approximate size of each chunk in bytes.
+
+    Returns:
+        Tuple[int, int]: The number of rows and of input bytes processed.
+    """
+    try:
+        data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):
+        data = None
+    if data is not None:
+        header_end = data.find(b'\n') + 1 or len(data)
+        header = data[:header_end]
+        chunks = iter_chunks(data, header_end, chunk_size)
+    else:
+        header = source.readline()
+        chunks = iter_stream_chunks(source, chunk_size)
+    columns = next(csv.reader([header.decode('utf-8')]), [])
+    rows, size = 0, len(header)
+
+    if workers <= 1:
+        init_worker(columns)
+        for chunk in chunks:
+            count, text = redact_chunk(chunk)
+            rows += count
+            size += len(chunk)
+            output.write(text)
+    else:
+        with Pool(workers, init_worker, (columns,)) as pool:
+            pending = deque()
+            for chunk in chunks:
+                size += len(chunk)
+                pending.append(pool.apply_async(redact_chunk, (chunk,)))
+                if len(pending) >= 2 * workers:
+                    count, text = pending.popleft().get()
+                    rows += count
+                    output.write(text)
+            while pending:
+                count, text = pending.popleft().get()
+                rows += count
+                output.write(text)
+
+    if data is not None:
+        data.close()
+    return rows, size
+
+
+def main() -> None:
+    """
+    Parses the command line, redacts the dump and prints a summary.
+    """
+    parser = argparse.ArgumentParser(
+        description="Redact PII from a CSV dump of user data.")
+    parser.add_argument("input", help="CSV file to redact, - for stdin")
+    parser.add_argument("-o", "--output", default="-",
+                        help="where to write the result, - for stdout")
+    parser.add_argument("-w", "--workers", type=int,
+                        default=os.cpu_count() or 1,
+                        help="number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="approximate chunk size in bytes")
+    args = parser.parse_args()
+
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    output = sys.stdout.buffer if args.output == "-" \
+        else open(args.output, "wb")
+    start = time.perf_counter()
+    try:
+        rows, size = redact_dump(source, output, args.workers,
+                                 args.chunk_size)
+    finally:
+        output.flush()
+        if source is not sys.stdin.buffer:
+            source.close()
+        if output is not sys.stdout.buffer:
+            output.close()
+    elapsed = time.perf_counter() - start or 1e-9
+    print("{} rows, {:.1f} MB in {:.2f}s with {} worker(s): "
+          "{:.0f} rows/sec, {:.1f} MB/sec".format(
+              rows, size / 1e6, elapsed, args.workers, rows / elapsed,
+              size / 1e6 / elapsed), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@
 Route module for the API
 """
 from os import getenv
+from api.v1.auth.path_matcher import PathMatcher
 from api.v1.views import app_views
 from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
@@ -26,11 +27,13 @@ else:
     from api.v1.auth.auth import Auth
     auth = Auth()
 
-# Define a list of paths that don't need authentication
+# Define a list of paths that don't need authentication,
+# compiled once into a matcher used on every request
 excluded_paths = [
     '/api/v1/status/',
     '/api/v1/unauthorized/',
     '/api/v1/forbidden/']
+excluded_paths_matcher = PathMatcher(excluded_paths)
 
 
 @app.before_request
@@ -42,7 +45,7 @@ def before_request():
 
     current_path = request.path
 
-    if auth.require_auth(current_path, excluded_paths):
+    if auth.require_auth(current_path, excluded_paths_matcher):
         authorization_header = auth.authorization_header(request)
         current_user = auth.current_user(request)
 
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Cache of verified Authorization headers
+"""
+from collections import OrderedDict
+from typing import Callable
+import hashlib
+import os
+import threading
+import time
+
+
+class CredentialCache:
+    """Bounded LRU cache with a time to live, keyed on Authorization
+    headers that were verified.
+
+    Headers are stored as a keyed BLAKE2b MAC under a per-process
+    random key, so the cache never holds credentials and its keys cannot
+    be used to test guesses offline. Each entry is resolved again on
+    every hit (see `get`), which is where a changed password or a
+    removed user drops it.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        """Create an empty cache.
+
+        Args:
+            max_size (int): Number of entries kept; 0 disables the cache.
+            ttl (float): Seconds an entry stays valid.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._secret = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, header: str) -> bytes:
+        """Keyed hash of an Authorization header.
+
+        Args:
+            header (str): The Authorization header.
+
+        Return:
+            bytes: The 128-bit keyed BLAKE2b digest of the header.
+        """
+        return hashlib.blake2b(header.encode('utf-8', 'surrogatepass'),
+                               key=self._secret, digest_size=16).digest()
+
+    def get(self, header: str, resolve: Callable[[tuple], object]) -> object:
+        """Look a header up and resolve its cached value.
+
+        Args:
+            header (str): The Authorization header.
+            resolve (Callable): Turns the cached value into the object to
+            return, or returns None when the value is stale.
+
+        Return:
+            object: The resolved object, or None on a miss.
+        """
+        if self.max_size <= 0:
+            return None
+        key = self.key(header)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+        resolved = resolve(entry[0])
+        with self._lock:
+            if resolved is None:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+            else:
+                self.hits += 1
+        return resolved
+
+    def put(self, header: str, value: tuple):
+        """Cache the value verified for a header, evicting the least
+        recently used entry when full.
+
+        Args:
+            header (str): The Authorization header.
+            value (tuple): What `resolve` will be given on a hit.
+        """
+        if self.max_size <= 0:
+            return
+        key = self.key(header)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Counters of the cache.
+
+        Return:
+            dict: hits, misses, invalidations and current size.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'invalidations': self.invalidations,
+                    'size': len(self._entries)}
+
+    def __len__(self) -> int:
+        """Number of cached entries.
+        """
+        return len(self._entries)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Precompiled matcher for the paths excluded from authentication
+"""
+from functools import lru_cache
+from typing import Iterable, Tuple
+
+
+class PathMatcher:
+    """Set of excluded path patterns, compiled once for fast lookups.
+
+    A pattern ending with '*' matches every path starting with what
+    precedes the '*'; any other pattern matches one path. Trailing
+    slashes are not significant: '/api/v1/status' and '/api/v1/status/'
+    match each other.
+
+    Exact patterns live in a set and wildcard prefixes in a character
+    trie, so a lookup costs one hash plus a walk of at most the length
+    of the path, whatever the number of patterns.
+    """
+
+    END = ''
+
+    def __init__(self, patterns: Iterable[str]):
+        """Compile the patterns.
+
+        Args:
+            patterns (Iterable[str]): Paths and '*'-terminated prefixes.
+        """
+        self.patterns = list(patterns)
+        self._exact = set()
+        self._trie = {}
+        for pattern in self.patterns:
+            if pattern.endswith('*'):
+                node = self._trie
+                for char in pattern[:-1]:
+                    node = node.setdefault(char, {})
+                node[self.END] = True
+            else:
+                self._exact.add(self.normalize(pattern))
+
+    @staticmethod
+    def normalize(path: str) -> str:
+        """Drop the trailing slashes of a path.
+
+        Args:
+            path (str): The path to normalize.
+
+        Return:
+            str: The path without trailing slashes.
+        """
+        return path.rstrip('/')
+
+    def matches(self, path: str) -> bool:
+        """Checks if a path matches one of the patterns.
+
+        Args:
+            path (str): The request path.
+
+        Return:
+            bool: True if the path is matched, False if not.
+        """
+        path = self.normalize(path)
+        if path in self._exact:
+            return True
+        node = self._trie
+        end = self.END
+        for char in path + '/':
+            if end in node:
+                return True
+            node = node.get(char)
+            if node is None:
+                return False
+        return end in node
+
+    def __len__(self) -> int:
+        """Number of patterns.
+        """
+        return len(self.patterns)
+
+
+@lru_cache(maxsize=32)
+def compile_paths(patterns: Tuple[str, ...]) -> PathMatcher:
+    """Compile a tuple of patterns once and reuse the matcher.
+
+    Args:
+        patterns (Tuple[str, ...]): Paths and '*'-terminated prefixes.
+
+    Return:
+        PathMatcher: The matcher of the patterns.
+    """
+    return PathMatcher(patterns)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+""" Benchmarks of the API views
+
+Usage: ./bench_api.py <benchmark> [sizes...]
+Requests go through the Flask test client with the authentication
+hook removed, and each benchmark runs in a temporary directory.
+"""
+import base64
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import List
+
+from flask import jsonify
+
+import api.v1.app
+from api.v1.app import app
+from api.v1.auth.basic_auth import BasicAuth
+from api.v1.auth.path_matcher import PathMatcher
+from models.user import User
+
+
+def populate(count: int):
+    """ Store `count` users
+    """
+    User.load_from_file()
+    User.save_many(User(email="user{}@hbtn.io".format(i),
+                        first_name="First{}".format(i),
+                        last_name="Last{}".format(i))
+                   for i in range(count))
+
+
+@app.route('/bench/users/list', methods=['GET'])
+def list_users_in_memory() -> str:
+    """ GET /api/v1/users as it was: one list, one jsonify
+    """
+    return jsonify([user.to_json() for user in User.all()])
+
+
+def measure(client, url: str) -> tuple:
+    """ Stream the response of `url`, return (seconds, peak bytes, size)
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(url, buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, size
+
+
+def bench_list(sizes: List[int]):
+    """ GET /api/v1/users: list + jsonify vs streamed, and one page
+    """
+    client = app.test_client()
+    print("{:>10}{:>22}{:>22}{:>22}".format(
+        "users", "jsonify (s / MiB)", "streamed (s / MiB)",
+        "limit=100 (s / MiB)"))
+    for size in sizes:
+        populate(size)
+        results = [measure(client, url) for url in (
+            '/bench/users/list', '/api/v1/users', '/api/v1/users?limit=100')]
+        assert results[0][2] == results[1][2]
+        print("{:>10}".format(size) + "".join(
+            "{:>13.2f}s {:>6.1f}M".format(elapsed, peak / 2 ** 20)
+            for elapsed, peak, _ in results))
+        os.remove(".db_User.json")
+
+
+def bench_cache(sizes: List[int]):
+    """ GET /api/v1/users per second with every cached JSON form
+    dropped before each request (as before the cache) and kept
+    """
+    client = app.test_client()
+    print("{:>10}{:>18}{:>18}".format("users", "uncached req/s",
+                                      "cached req/s"))
+    for size in sizes:
+        populate(size)
+        users = User.all()
+        results = []
+        for drop in (True, False):
+            client.get('/api/v1/users').data
+            elapsed = 0
+            for _ in range(5):
+                if drop:
+                    for user in users:
+                        user.id = user.id
+                start = time.perf_counter()
+                client.get('/api/v1/users').data
+                elapsed += time.perf_counter() - start
+            results.append(5 / elapsed)
+        print("{:>10}{:>18.2f}{:>18.2f}".format(size, *results))
+        os.remove(".db_User.json")
+
+
+def excluded_by_loop(path: str, excluded_paths: List[str]) -> bool:
+    """ Auth.require_auth as it was: a scan of the excluded paths
+    """
+    for excluded_path in excluded_paths:
+        if excluded_path.endswith("*") and \
+                path.startswith(excluded_path[:-1]):
+            return True
+        elif path == excluded_path:
+            return True
+    return False
+
+
+def bench_paths(sizes: List[int]):
+    """ Excluded path checks per second: loop vs PathMatcher, for N
+    patterns (3/4 exact, 1/4 wildcards) and paths that hit an exact
+    pattern, hit a wildcard or miss
+    """
+    print("{:>10}{:>18}{:>18}{:>10}".format(
+        "patterns", "loop/sec", "matcher/sec", "build ms"))
+    for size in sizes:
+        patterns = ["/api/v1/route{}/".format(i) if i % 4
+                    else "/api/v1/static{}/*".format(i)
+                    for i in range(size)]
+        paths = ["/api/v1/route{}/".format(size - 1),
+                 "/api/v1/static0/css/site.css",
+                 "/api/v1/users/1c8b4f9e-4d1f-4a39-9e0f-7b3f6a0d2f11"]
+        start = time.perf_counter()
+        matcher = PathMatcher(patterns)
+        build = time.perf_counter() - start
+        repeat = 20000
+        results = []
+        for check in (lambda path: excluded_by_loop(path, patterns),
+                      matcher.matches):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for path in paths:
+                    check(path)
+            results.append(repeat * len(paths) /
+                           (time.perf_counter() - start))
+        print("{:>10}{:>18,.0f}{:>18,.0f}{:>10.2f}".format(
+            size, *results, build * 1000))
+
+
+class HeadersOnly():
+    """ Stand-in for a request, with just the headers Auth reads
+    """
+
+    def __init__(self, headers: dict):
+        self.headers = headers
+
+
+def bench_basic(sizes: List[int]):
+    """ Authenticated GET /api/v1/users/<id> per second with Basic auth,
+    N clients taking turns, without and with the credential cache, and
+    BasicAuth.current_user calls per second alone
+    """
+    print("{:>10}{:>16}{:>16}{:>18}{:>18}{:>10}{:>10}".format(
+        "clients", "no cache req/s", "cache req/s", "no cache auth/s",
+        "cache auth/s", "hits", "misses"))
+    app.before_request_funcs[None] = [api.v1.app.before_request]
+    client = app.test_client()
+    for size in sizes:
+        User.load_from_file()
+        users = [User(email="user{}@hbtn.io".format(i)) for i in range(size)]
+        for user in users:
+            user.password = "pwd{}".format(user.email)
+        User.save_many(users)
+        requests = [("/api/v1/users/{}".format(user.id), {
+            "Authorization": "Basic " + base64.b64encode("{}:pwd{}".format(
+                user.email, user.email).encode()).decode()})
+            for user in users]
+        requests = (requests * (4000 // size + 1))[:max(4000, size)]
+        for url, headers in requests[:1000]:
+            client.get(url, headers=headers)
+        results = []
+        for cache_size in (0, 1024):
+            api.v1.app.auth = auth = BasicAuth()
+            auth.credential_cache.max_size = cache_size
+            start = time.perf_counter()
+            for url, headers in requests:
+                assert client.get(url, headers=headers).status_code == 200
+            results.append(len(requests) / (time.perf_counter() - start))
+            stats = auth.credential_cache.stats()
+        for cache_size in (0, 1024):
+            auth = BasicAuth()
+            auth.credential_cache.max_size = cache_size
+            start = time.perf_counter()
+            for _, headers in requests:
+                auth.current_user(HeadersOnly(headers))
+            results.append(len(requests) / (time.perf_counter() - start))
+        print("{:>10}{:>16,.0f}{:>16,.0f}{:>18,.0f}{:>18,.0f}{:>10}{:>10}"
+              .format(size, *results, stats['hits'], stats['misses']))
+        os.remove(".db_User.json")
+    app.before_request_funcs.clear()
+
+
+BENCHMARKS = {
+    "list": (bench_list, [10000, 100000]),
+    "cache": (bench_cache, [50000]),
+    "paths": (bench_paths, [10, 100, 1000]),
+    "basic": (bench_basic, [1, 100, 10000]),
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print("Usage: {} <{}> [sizes...]".format(
+            sys.argv[0], "|".join(BENCHMARKS)))
+        sys.exit(1)
+    app.before_request_funcs.clear()
+    bench, sizes = BENCHMARKS[sys.argv[1]]
+    sizes = [int(size) for size in sys.argv[2:]] or sizes
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        bench(sizes)
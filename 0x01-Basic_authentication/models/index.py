@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+""" Index module
+"""
+from typing import Iterable, Iterator, Tuple
+import bisect
+
+
+class Index():
+    """ Secondary index mapping one attribute's values to object IDs
+    """
+
+    def __init__(self, attribute: str):
+        """ Initialize an empty index on `attribute`
+        """
+        self.attribute = attribute
+        self._ids_by_value = {}
+        self._value_by_id = {}
+
+    def add(self, obj_id: str, value):
+        """ Index an object ID under its attribute value
+        """
+        self.discard(obj_id)
+        try:
+            self._ids_by_value.setdefault(value, {})[obj_id] = None
+        except TypeError:
+            return
+        self._value_by_id[obj_id] = value
+
+    def discard(self, obj_id: str):
+        """ Remove an object ID from the index
+        """
+        if obj_id not in self._value_by_id:
+            return
+        value = self._value_by_id.pop(obj_id)
+        ids = self._ids_by_value[value]
+        del ids[obj_id]
+        if not ids:
+            del self._ids_by_value[value]
+
+    def lookup(self, value) -> Iterable[str]:
+        """ Return the IDs of objects indexed under `value`
+        """
+        try:
+            return self._ids_by_value.get(value, {}).keys()
+        except TypeError:
+            return None
+
+    def clear(self):
+        """ Remove every entry
+        """
+        self._ids_by_value.clear()
+        self._value_by_id.clear()
+
+    def __len__(self) -> int:
+        """ Number of indexed objects
+        """
+        return len(self._value_by_id)
+
+
+class _Top():
+    """ Sorts after any object ID, to bound (value, id) keys by value
+    """
+
+    def __lt__(self, other) -> bool:
+        return False
+
+    def __le__(self, other) -> bool:
+        return other is self
+
+    def __gt__(self, other) -> bool:
+        return other is not self
+
+    def __ge__(self, other) -> bool:
+        return True
+
+
+_TOP = _Top()
+
+
+class SortedIndex():
+    """ Index keeping object IDs ordered by one attribute's value
+
+    Entries are (value, ID) pairs kept in sorted chunks of at most
+    2 * CHUNK_SIZE, so an insertion or removal moves one chunk rather
+    than the whole index. IDs whose value is None or cannot be compared
+    with the others are kept apart and sort first.
+    """
+
+    CHUNK_SIZE = 512
+
+    def __init__(self, attribute: str):
+        """ Initialize an empty index on `attribute`
+        """
+        self.attribute = attribute
+        self._chunks = []
+        self._maxes = []
+        self._key_by_id = {}
+        self._unordered = {}
+
+    def add(self, obj_id: str, value):
+        """ Index an object ID under its attribute value
+        """
+        self.discard(obj_id)
+        if value is None:
+            self._unordered[obj_id] = None
+            return
+        key = (value, obj_id)
+        try:
+            self._insert(key)
+        except TypeError:
+            self._unordered[obj_id] = None
+            return
+        self._key_by_id[obj_id] = key
+
+    def fill(self, entries: Iterable[Tuple[str, object]]):
+        """ Index (ID, value) pairs at once, sorting them in one go if
+        the index is empty
+        """
+        if self._key_by_id or self._unordered:
+            for obj_id, value in entries:
+                self.add(obj_id, value)
+            return
+        keys = []
+        for obj_id, value in entries:
+            if value is None:
+                self._unordered[obj_id] = None
+            else:
+                keys.append((value, obj_id))
+        try:
+            keys.sort()
+        except TypeError:
+            for value, obj_id in keys:
+                self.add(obj_id, value)
+            return
+        size = self.CHUNK_SIZE
+        self._chunks = [keys[i:i + size] for i in range(0, len(keys), size)]
+        self._maxes = [chunk[-1] for chunk in self._chunks]
+        self._key_by_id = {key[1]: key for key in keys}
+
+    def discard(self, obj_id: str):
+        """ Remove an object ID from the index
+        """
+        if self._unordered.pop(obj_id, 0) is None:
+            return
+        key = self._key_by_id.pop(obj_id, None)
+        if key is None:
+            return
+        i = bisect.bisect_left(self._maxes, key)
+        chunk = self._chunks[i]
+        del chunk[bisect.bisect_left(chunk, key)]
+        if not chunk:
+            del self._chunks[i]
+            del self._maxes[i]
+        else:
+            self._maxes[i] = chunk[-1]
+
+    def _insert(self, key: tuple):
+        """ Insert a (value, ID) key into its chunk
+        """
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            return
+        i = bisect.bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+            self._chunks[i].append(key)
+            self._maxes[i] = key
+        else:
+            bisect.insort(self._chunks[i], key)
+        chunk = self._chunks[i]
+        if len(chunk) > 2 * self.CHUNK_SIZE:
+            self._chunks[i:i + 1] = [chunk[:self.CHUNK_SIZE],
+                                     chunk[self.CHUNK_SIZE:]]
+            self._maxes[i:i + 1] = [chunk[self.CHUNK_SIZE - 1], chunk[-1]]
+
+    def _position(self, key: tuple) -> Tuple[int, int]:
+        """ Return (chunk, offset) of the first entry not below `key`
+        """
+        i = bisect.bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return i, 0
+        return i, bisect.bisect_left(self._chunks[i], key)
+
+    @staticmethod
+    def _bounds(low, high, low_inclusive: bool,
+                high_inclusive: bool) -> Tuple[tuple, tuple]:
+        """ Turn value bounds into (value, ID) key bounds, high excluded
+        """
+        low_key = None if low is None else \
+            (low,) if low_inclusive else (low, _TOP)
+        high_key = None if high is None else \
+            (high, _TOP) if high_inclusive else (high,)
+        return low_key, high_key
+
+    def range(self, low=None, high=None, low_inclusive: bool = True,
+              high_inclusive: bool = True,
+              reverse: bool = False) -> Iterator[str]:
+        """ Yield the IDs whose value lies between `low` and `high`
+        (None meaning unbounded), in value order
+        """
+        low_key, high_key = self._bounds(low, high, low_inclusive,
+                                         high_inclusive)
+        chunks = self._chunks
+        if not reverse:
+            i, j = self._position(low_key) if low_key else (0, 0)
+            while i < len(chunks):
+                for key in chunks[i][j:]:
+                    if high_key is not None and key >= high_key:
+                        return
+                    yield key[1]
+                i, j = i + 1, 0
+        else:
+            i, j = self._position(high_key) if high_key \
+                else (len(chunks), 0)
+            if i == len(chunks):
+                i, j = i - 1, len(chunks[i - 1]) if chunks else 0
+            while i >= 0:
+                for key in reversed(chunks[i][:j]):
+                    if low_key is not None and key < low_key:
+                        return
+                    yield key[1]
+                i -= 1
+                j = len(chunks[i]) if i >= 0 else 0
+
+    def count(self, low=None, high=None, low_inclusive: bool = True,
+              high_inclusive: bool = True) -> int:
+        """ Count the IDs `range` would yield
+        """
+        low_key, high_key = self._bounds(low, high, low_inclusive,
+                                         high_inclusive)
+        start = self._offset(low_key) if low_key else 0
+        end = self._offset(high_key) if high_key else len(self._key_by_id)
+        return max(end - start, 0)
+
+    def _offset(self, key: tuple) -> int:
+        """ Number of entries below `key`
+        """
+        i, j = self._position(key)
+        return sum(len(chunk) for chunk in self._chunks[:i]) + j
+
+    def ordered(self, reverse: bool = False) -> Iterator[str]:
+        """ Yield every indexed ID in value order, unordered IDs first
+        and by ID
+        """
+        if not reverse:
+            yield from sorted(self._unordered)
+        yield from self.range(reverse=reverse)
+        if reverse:
+            yield from sorted(self._unordered, reverse=True)
+
+    def clear(self):
+        """ Remove every entry
+        """
+        self._chunks.clear()
+        self._maxes.clear()
+        self._key_by_id.clear()
+        self._unordered.clear()
+
+    def __len__(self) -> int:
+        """ Number of indexed objects
+        """
+        return len(self._key_by_id) + len(self._unordered)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+""" Readers-writer lock module
+"""
+import threading
+
+
+class RWLock():
+    """ Lock shared by any number of readers or held by one writer
+
+    Waiting writers go before new readers so a steady stream of reads
+    cannot starve them. Both sides are reentrant, and the writer may
+    also take the read side, but a reader cannot upgrade to writing.
+
+    Usage: `with lock.read():` / `with lock.write():`
+    """
+
+    def __init__(self):
+        """ Initialize an unlocked lock
+        """
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writers_waiting = 0
+        self._local = threading.local()
+        self._read_guard = _Guard(self.acquire_read, self.release_read)
+        self._write_guard = _Guard(self.acquire_write, self.release_write)
+
+    def read(self) -> '_Guard':
+        """ Return a context manager holding the lock shared
+        """
+        return self._read_guard
+
+    def write(self) -> '_Guard':
+        """ Return a context manager holding the lock exclusively
+        """
+        return self._write_guard
+
+    def acquire_read(self):
+        """ Take the lock shared, waiting for the writers
+        """
+        local = self._local
+        depth = getattr(local, 'depth', 0)
+        if depth == 0 and self._writer != threading.get_ident():
+            with self._cond:
+                while self._writer is not None or self._writers_waiting:
+                    self._cond.wait()
+                self._readers += 1
+            local.shared = True
+        elif depth == 0:
+            local.shared = False
+        local.depth = depth + 1
+
+    def release_read(self):
+        """ Give the shared lock back
+        """
+        local = self._local
+        local.depth -= 1
+        if local.depth == 0 and local.shared:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    def acquire_write(self):
+        """ Take the lock exclusively, waiting for readers and writers
+        """
+        me = threading.get_ident()
+        if self._writer == me:
+            self._write_depth += 1
+            return
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        """ Give the exclusive lock back
+        """
+        self._write_depth -= 1
+        if self._write_depth == 0:
+            with self._cond:
+                self._writer = None
+                self._cond.notify_all()
+
+
+class _Guard():
+    """ Context manager calling an acquire and a release function
+    """
+
+    __slots__ = ('_acquire', '_release')
+
+    def __init__(self, acquire, release):
+        """ Wrap `acquire` and `release`
+        """
+        self._acquire = acquire
+        self._release = release
+
+    def __enter__(self):
+        """ Acquire on the way into the block
+        """
+        self._acquire()
+
+    def __exit__(self, *exc_info):
+        """ Release on the way out of the block
+        """
+        self._release()
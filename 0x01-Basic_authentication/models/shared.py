@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+""" Shared state module
+
+Lock file coordinating the processes that use one class's store. It
+holds an advisory `fcntl` lock and a small header, mapped in memory so
+checking it for changes costs no system call:
+
+    generation  bumped each time the journal is folded into the snapshot
+    end         size of the journal after the last write
+    compacted   size the journal had when it was last folded
+"""
+from contextlib import contextmanager
+from typing import Tuple
+import fcntl
+import mmap
+import os
+import struct
+
+
+HEADER = struct.Struct('<QQQ')
+
+
+class SharedState():
+    """ Advisory lock and change header kept in `.db_<Class>.lock`
+    """
+
+    def __init__(self, file_path: str):
+        """ Open `file_path`, creating an empty header if needed
+        """
+        self.file_path = file_path
+        self.pid = os.getpid()
+        self._fd = os.open(file_path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._depth = 0
+        with self.lock(exclusive=True):
+            if os.fstat(self._fd).st_size < HEADER.size:
+                os.ftruncate(self._fd, HEADER.size)
+        self._mmap = mmap.mmap(self._fd, HEADER.size)
+
+    @contextmanager
+    def lock(self, exclusive: bool = False):
+        """ Hold the file lock, shared or exclusive, for the block
+
+        The lock belongs to the process, so callers serialize threads
+        themselves. Nested blocks join the outer one and keep its mode.
+        """
+        if self._depth == 0:
+            fcntl.flock(self._fd,
+                        fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def read(self) -> Tuple[int, int, int]:
+        """ Return (generation, end, compacted)
+        """
+        return HEADER.unpack_from(self._mmap, 0)
+
+    def write(self, generation: int, end: int, compacted: int):
+        """ Publish a new header; the exclusive lock must be held
+        """
+        HEADER.pack_into(self._mmap, 0, generation, end, compacted)
+
+    def close(self):
+        """ Unmap and close the lock file
+        """
+        self._mmap.close()
+        os.close(self._fd)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+""" Storage module
+
+Interface of the storage backends `models.base.Base` can hand its
+persistence to. The JSON files handled by `Base` itself stay the
+default; MODELS_STORAGE names another backend (see STORAGE_BACKENDS
+in models.base).
+"""
+from contextlib import contextmanager
+from typing import Iterator, List, TypeVar
+
+
+class Storage():
+    """ Storage backend interface
+
+    Methods receive the model class or instance; objects are rebuilt
+    with `cls(**record)` from the `to_json(True)` form they were saved
+    in.
+    """
+
+    def load(self, cls: type):
+        """ Prepare the store of `cls` (called by `load_from_file`)
+        """
+
+    def save(self, obj: TypeVar('Base')):
+        """ Insert or replace one object
+        """
+        raise NotImplementedError
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Delete one object
+        """
+        raise NotImplementedError
+
+    def get(self, cls: type, obj_id: str) -> TypeVar('Base'):
+        """ Return one object by ID, or None
+        """
+        raise NotImplementedError
+
+    def search(self, cls: type, attributes: dict) -> List[TypeVar('Base')]:
+        """ Return the objects whose attributes equal `attributes`
+        """
+        return list(self.iter_search(cls, attributes))
+
+    def iter_search(self, cls: type, attributes: dict, cursor: str = None,
+                    limit: int = None) -> Iterator[TypeVar('Base')]:
+        """ Yield the objects whose attributes equal `attributes`
+
+        Only IDs greater than `cursor` are considered; with `limit`,
+        the `limit` lowest of them are yielded in ID order.
+        """
+        raise NotImplementedError
+
+    def query(self, cls: type, conditions: List[tuple], order_by: str = None,
+              limit: int = None) -> List[TypeVar('Base')]:
+        """ Return the objects meeting every (attribute, operator,
+        operand) condition, with the semantics of `Base.query`
+        """
+        raise NotImplementedError
+
+    def count(self, cls: type) -> int:
+        """ Count the objects of `cls`
+        """
+        raise NotImplementedError
+
+    @contextmanager
+    def transaction(self):
+        """ Group the writes of the block, for `Base.transaction`
+        """
+        yield
@@ -2,14 +2,40 @@
 """
 Route module for the API
 """
+from contextlib import contextmanager
 from os import getenv
+from api.v1.auth.path_matcher import PathMatcher
 from api.v1.views import app_views
-from flask import Flask, jsonify, abort, request
+from flask import Flask, jsonify, abort, request, g
+from flask.wrappers import Request
 from flask_cors import (CORS, cross_origin)
+from werkzeug.utils import cached_property
 import os
+import threading
+import time
+
+
+class AuthRequest(Request):
+    """Request resolving its authenticated user on first access.
+    """
+
+    @cached_property
+    def current_user(self):
+        """The user the request authenticates as, or None.
+
+        Resolved at most once per request, and only when something
+        reads it, so excluded and anonymous requests never look a
+        session or a user up.
+        """
+        if auth is None:
+            return None
+        with auth_stage('current_user'):
+            return auth.current_user(self)
+
 
 # Create a Flask application and configure CORS settings
 app = Flask(__name__)
+app.request_class = AuthRequest
 app.register_blueprint(app_views)
 CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
 
@@ -19,48 +45,93 @@ auth_type = getenv('AUTH_TYPE')
 
 # Instantiate the appropriate authentication class based on
 # the value of AUTH_TYPE
-if AUTH_TYPE == "auth":
+if auth_type == "auth":
     from api.v1.auth.auth import Auth
     auth = Auth()
-elif AUTH_TYPE == "basic_auth":
+elif auth_type == "basic_auth":
     from api.v1.auth.basic_auth import BasicAuth
     auth = BasicAuth()
-elif AUTH_TYPE == "session_auth":
+elif auth_type == "session_auth":
     from api.v1.auth.session_auth import SessionAuth
     auth = SessionAuth()
-elif AUTH_TYPE == "session_exp_auth":
+elif auth_type == "session_exp_auth":
     from api.v1.auth.session_exp_auth import SessionExpAuth
     auth = SessionExpAuth()
-elif AUTH_TYPE == "session_db_auth":
+elif auth_type == "session_db_auth":
     from api.v1.auth.session_db_auth import SessionDBAuth
     auth = SessionDBAuth()
 
-# Define a list of paths that don't need authentication
+# Define a list of paths that don't need authentication,
+# compiled once into a matcher used on every request
 excluded_paths = [
     '/api/v1/status/',
     '/api/v1/unauthorized/',
     '/api/v1/forbidden/'
 ]
+excluded_paths_matcher = PathMatcher(excluded_paths)
+
+# Time spent in each stage of the auth pipeline: stage -> [calls, seconds]
+# With AUTH_SERVER_TIMING=1 each response also reports its own stages in
+# a Server-Timing header
+auth_timings = {}
+auth_timings_lock = threading.Lock()
+server_timing = getenv('AUTH_SERVER_TIMING', '0') == '1'
+
+
+@contextmanager
+def auth_stage(stage: str):
+    """Time one stage of the auth pipeline for the current request.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        g.setdefault('auth_timings', []).append((stage, elapsed))
+        with auth_timings_lock:
+            totals = auth_timings.setdefault(stage, [0, 0.0])
+            totals[0] += 1
+            totals[1] += elapsed
 
 
 @app.before_request
 def before_request():
     """Filter and authenticate incoming API requests.
+
+    Excluded paths and requests carrying neither an Authorization header
+    nor a session cookie are answered without touching storage; others
+    resolve request.current_user once, and views reuse it.
     """
     if auth is None:
-        pass
+        return
+
+    with auth_stage('require_auth'):
+        required = auth.require_auth(request.path, excluded_paths_matcher)
 
-    current_path = request.path
+    if not required:
+        return
 
-    if auth.require_auth(current_path, excluded_paths):
-        authorization_header = auth.authorization_header(request)
-        current_user = auth.current_user(request)
+    with auth_stage('credentials'):
+        anonymous = auth.authorization_header(request) is None and \
+            auth.session_cookie(request) is None
 
-        if authorization_header is None and cookie is None:
-            abort(401, description="Unauthorized")
+    if anonymous:
+        abort(401, description="Unauthorized")
 
-        if current_user is None:
-            abort(403, description="Forbidden")
+    if request.current_user is None:
+        abort(403, description="Forbidden")
+
+
+@app.after_request
+def add_server_timing(response):
+    """Report the auth stages of the request in a Server-Timing header.
+    """
+    timings = g.get('auth_timings')
+    if server_timing and timings:
+        response.headers['Server-Timing'] = ', '.join(
+            'auth_{};dur={:.3f}'.format(stage, seconds * 1000)
+            for stage, seconds in timings)
+    return response
 
 
 @app.errorhandler(404)
@@ -3,7 +3,9 @@
 Custom API authentication
 """
 from typing import List, TypeVar
+import os
 from flask import request
+from api.v1.auth.path_matcher import PathMatcher, compile_paths
 
 
 class Auth:
@@ -13,24 +15,23 @@ class Auth:
     def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
         """Checks if authentication is required for a given path.
 
+        Trailing slashes are not significant and a path ending with '*'
+        excludes every path starting with what precedes it. A list is
+        compiled once into a PathMatcher; passing one skips even that.
+
         Args:
             path (str): The path to check for authentication.
-            excluded_paths (List[str]): List of excluded paths.
+            excluded_paths (List[str]): List of excluded paths, or
+            a PathMatcher built from them.
 
         Return:
             bool: True if authentication is required, False if not.
         """
         if path is None or excluded_paths is None or not excluded_paths:
             return True
-        elif path in excluded_paths:
-            return False
-        else:
-            for excluded_path in excluded_paths:
-                if excluded_path.endswith(
-                        "*") and path.startswith(excluded_path[:-1]):
-                    return False
-
-        return True
+        if not isinstance(excluded_paths, PathMatcher):
+            excluded_paths = compile_paths(tuple(excluded_paths))
+        return not excluded_paths.matches(path)
 
     def authorization_header(self, request=None) -> str:
         """Get the authorization header from the request.
@@ -3,16 +3,29 @@
 Custom basic API authentication
 """
 from api.v1.auth.auth import Auth
+from api.v1.auth.credential_cache import CredentialCache
 import base64
 import binascii
+import os
 from models.user import User
 from typing import TypeVar, List, Tuple
 
 
 class BasicAuth(Auth):
     """BasicAuth class for basic authentication management.
+
+    Verified Authorization headers are remembered in a CredentialCache
+    sized by BASIC_AUTH_CACHE_SIZE (default 1024, 0 disables it) whose
+    entries expire after BASIC_AUTH_CACHE_TTL seconds (default 300).
     """
 
+    def __init__(self):
+        """Create the cache of verified credentials.
+        """
+        self.credential_cache = CredentialCache(
+            int(os.getenv('BASIC_AUTH_CACHE_SIZE', '1024')),
+            float(os.getenv('BASIC_AUTH_CACHE_TTL', '300')))
+
     def extract_base64_authorization_header(
             self, authorization_header: str) -> str:
         """"Extract the Base64 part of the Authorization header
@@ -128,6 +141,9 @@ class BasicAuth(Auth):
         Return:
           TypeVar('User'): The User instance if authorized,
           or None if not found.
+
+        A header seen before is answered from the credential cache
+        without decoding it or checking the password again.
         """
         if request is None:
             return None
@@ -137,6 +153,11 @@ class BasicAuth(Auth):
         if auth_header is None:
             return None
 
+        user = self.credential_cache.get(auth_header, self.cached_user)
+
+        if user is not None:
+            return user
+
         base64_auth_header = self.extract_base64_authorization_header(
             auth_header)
 
@@ -156,3 +177,29 @@ class BasicAuth(Auth):
             return None
 
         user = self.user_object_from_credentials(user_email, user_pwd)
+
+        if user is not None:
+            self.credential_cache.put(
+                auth_header, (user.id, user.email, user.password))
+
+        return user
+
+    def cached_user(self, credentials: tuple) -> TypeVar('User'):
+        """Get the User a cached header was verified for.
+
+        Args:
+          credentials (tuple): The user's id, email and password hash
+          when the header was verified.
+
+        Return:
+          TypeVar('User'): The User instance, or None if it was removed
+          or its email or password changed since.
+        """
+        user_id, user_email, user_pwd = credentials
+        user = User.get(user_id)
+
+        if user is None or user.email != user_email or \
+                user.password != user_pwd:
+            return None
+
+        return user
@@ -57,6 +57,9 @@ class SessionAuth(Auth):
         """
         session_cookie = self.session_cookie(request)
         user_id = self.user_id_for_session_id(session_cookie)
+        if user_id is None:
+            return None
+
         user = User.get(user_id)
 
         return user
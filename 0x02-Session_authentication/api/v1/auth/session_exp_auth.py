@@ -6,12 +6,17 @@ assignment handler.
 import os
 from datetime import datetime, timedelta
 from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.session_store import SessionStore
 
 
 class SessionExpAuth(SessionAuth):
     """
     Sub-class of session authenitication providing
     supporting for assigning expiration dates.
+
+    Sessions live in a SessionStore that evicts expired ones in the
+    background and keeps at most SESSION_MAX_COUNT (default 100000),
+    dropping the least recently used.
     """
 
     def __init__(self):
@@ -25,6 +30,13 @@ class SessionExpAuth(SessionAuth):
 
         self.session_duration = duration
 
+        try:
+            max_sessions = int(os.getenv('SESSION_MAX_COUNT', '100000'))
+        except Exception:
+            max_sessions = 100000
+
+        self.user_id_by_session_id = SessionStore(duration, max_sessions)
+
     def create_session(self, user_id=None):
         """Method creates a Session ID for a user.
 
@@ -65,6 +77,7 @@ class SessionExpAuth(SessionAuth):
             allowed_window = created_at + \
                 timedelta(seconds=self.session_duration)
             if allowed_window < datetime.now():
+                self.user_id_by_session_id.expire(session_id)
                 return None
 
         return user_details.get("user_id")
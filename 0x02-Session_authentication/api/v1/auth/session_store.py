@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Expiring, size-capped store of authentication sessions
+"""
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+import heapq
+import threading
+
+
+class SessionStore(MutableMapping):
+    """Mapping of session IDs to session data with expiry and a cap.
+
+    Values are what SessionAuth stores: a user ID, or a dictionary with
+    "user_id" and "created_at" keys. With a positive duration, each
+    dictionary value is expected to expire `duration` seconds after its
+    "created_at"; those expiry times are kept in a heap, and a
+    background thread sleeps until the earliest one and evicts the
+    sessions due, in O(expired log n). Changing "created_at" in place is
+    noticed when the old expiry comes up. Entries left in the heap by
+    destroyed or evicted sessions are dropped by rebuilding it once it
+    holds twice as many entries as there are sessions.
+
+    At most `max_sessions` sessions are kept; adding one more evicts the
+    least recently used. Reading a session counts as using it.
+    """
+
+    RESOLUTION = 1.0
+
+    def __init__(self, duration: int = 0, max_sessions: int = 100000,
+                 sweeper: bool = True):
+        """Create an empty store.
+
+        Args:
+            duration (int): Session lifetime in seconds; 0 or less means
+            sessions never expire.
+            max_sessions (int): Cap on live sessions; 0 or less means no
+            cap.
+            sweeper (bool): Start the background sweeper with the first
+            expiring session; without it, call `sweep` yourself.
+        """
+        self.duration = duration
+        self.max_sessions = max_sessions
+        self.background = sweeper
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+        self.destroyed = 0
+        self._sessions = OrderedDict()
+        self._expiries = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._sweeper = None
+
+    def expires_at(self, session) -> datetime:
+        """Expiry time of a session value.
+
+        Args:
+            session: A stored value.
+
+        Return:
+            datetime: When the session expires, or None if it does not.
+        """
+        if self.duration <= 0 or not isinstance(session, dict) or \
+                session.get("created_at") is None:
+            return None
+        return session["created_at"] + timedelta(seconds=self.duration)
+
+    def __setitem__(self, session_id: str, session):
+        """Add or replace a session, evicting the least recently used
+        ones beyond the cap.
+        """
+        expires_at = self.expires_at(session)
+        with self._lock:
+            if session_id not in self._sessions:
+                self.created += 1
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            while 0 < self.max_sessions < len(self._sessions):
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+            if expires_at is not None:
+                heapq.heappush(self._expiries, (expires_at, session_id))
+                if len(self._expiries) > 2 * len(self._sessions) + 1024:
+                    self._rebuild()
+                if self._expiries[0][1] == session_id:
+                    self._wakeup.notify()
+        if expires_at is not None and self._sweeper is None and \
+                self.background:
+            self.start()
+
+    def __getitem__(self, session_id: str):
+        """Return a session and mark it as recently used.
+        """
+        with self._lock:
+            session = self._sessions[session_id]
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def __delitem__(self, session_id: str):
+        """Destroy a session.
+        """
+        with self._lock:
+            del self._sessions[session_id]
+            self.destroyed += 1
+
+    def expire(self, session_id: str):
+        """Drop a session found expired on read.
+
+        Args:
+            session_id (str): The session ID.
+        """
+        with self._lock:
+            if self._sessions.pop(session_id, None) is not None:
+                self.expired += 1
+
+    def __iter__(self):
+        """Iterate over a snapshot of the session IDs.
+        """
+        with self._lock:
+            return iter(list(self._sessions))
+
+    def __len__(self) -> int:
+        """Number of live sessions.
+        """
+        return len(self._sessions)
+
+    def sweep(self, now: datetime = None) -> int:
+        """Evict every session whose expiry has passed.
+
+        Args:
+            now (datetime): The current time, datetime.now() by default.
+
+        Return:
+            int: The number of sessions evicted.
+        """
+        with self._lock:
+            return self._sweep(now or datetime.now())
+
+    def _sweep(self, now: datetime) -> int:
+        """Pop the due heap entries; the lock must be held.
+        """
+        count = 0
+        expiries = self._expiries
+        while expiries and expiries[0][0] <= now:
+            _, session_id = heapq.heappop(expiries)
+            session = self._sessions.get(session_id)
+            if session is None:
+                continue
+            expires_at = self.expires_at(session)
+            if expires_at is None:
+                continue
+            if expires_at > now:
+                heapq.heappush(expiries, (expires_at, session_id))
+                continue
+            del self._sessions[session_id]
+            self.expired += 1
+            count += 1
+        return count
+
+    def _rebuild(self):
+        """Rebuild the heap from the live sessions, dropping the entries
+        of destroyed and evicted ones; the lock must be held.
+        """
+        self._expiries = [(expires_at, session_id)
+                          for session_id, expires_at in (
+                              (session_id, self.expires_at(session))
+                              for session_id, session
+                              in self._sessions.items())
+                          if expires_at is not None]
+        heapq.heapify(self._expiries)
+
+    def start(self):
+        """Start the background sweeper, once.
+        """
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(target=self._sweep_forever,
+                                             daemon=True)
+        self._sweeper.start()
+
+    def _sweep_forever(self):
+        """Sleep until the earliest expiry, at least RESOLUTION seconds
+        apart, and sweep.
+        """
+        with self._wakeup:
+            while True:
+                if not self._expiries:
+                    self._wakeup.wait()
+                    continue
+                delay = (self._expiries[0][0] - datetime.now()) \
+                    .total_seconds()
+                if delay > 0:
+                    self._wakeup.wait(max(delay, self.RESOLUTION))
+                    continue
+                self._sweep(datetime.now())
+
+    def stats(self) -> dict:
+        """Counters of the store.
+
+        Return:
+            dict: live sessions, and those created, expired, evicted by
+            the cap and destroyed so far.
+        """
+        with self._lock:
+            return {'live': len(self._sessions), 'created': self.created,
+                    'expired': self.expired, 'evicted': self.evicted,
+                    'destroyed': self.destroyed}
@@ -1,19 +1,65 @@
 #!/usr/bin/env python3
 """ Module of Users views
 """
+from typing import Iterable, Iterator
+import itertools
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import (Response, abort, current_app, jsonify, request,
+                   stream_with_context, url_for)
 from models.user import User
 
+STREAM_CHUNK_SIZE = 100
+
+
+def stream_json_list(users: Iterable[User]) -> Iterator[str]:
+    """ Yield a JSON list of users, STREAM_CHUNK_SIZE users per chunk,
+    formatted like jsonify
+    """
+    yield '['
+    separator = ''
+    chunk = []
+    for user in itertools.chain(users, [None]):
+        if user is not None:
+            chunk.append(user.to_json())
+        if len(chunk) == STREAM_CHUNK_SIZE or (user is None and chunk):
+            yield separator + current_app.json.dumps(
+                chunk, separators=(',', ':'))[1:-1]
+            separator = ','
+            chunk = []
+    yield ']\n'
+
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters:
+      - limit (optional): maximum number of users to return
+      - cursor (optional): ID of the last user of the previous page
     Return:
-      - list of all User objects JSON represented
+      - list of User objects JSON represented, streamed; with limit,
+        ordered by ID and with a `Link: <...>; rel="next"` header when
+        more users follow
+      - 400 if limit isn't a positive integer
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit')
+    headers = {}
+    if limit is None:
+        users = User.iter_search(cursor=cursor)
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit <= 0:
+            return jsonify({'error': "limit must be a positive integer"}), 400
+        users = list(User.iter_search(cursor=cursor, limit=limit + 1))
+        if len(users) > limit:
+            users = users[:limit]
+            headers['Link'] = '<{}>; rel="next"'.format(url_for(
+                'app_views.view_all_users', limit=limit, cursor=users[-1].id))
+    return Response(stream_with_context(stream_json_list(users)),
+                    mimetype='application/json', headers=headers)
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
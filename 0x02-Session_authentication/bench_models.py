@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+""" Benchmarks of the file-backed model store
+
+Usage: ./bench_models.py <benchmark> [sizes...]
+Each benchmark runs in a temporary directory, so existing
+.db_*.json files are left untouched.
+"""
+import gc
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+import models.base
+from models.snapshot import convert
+from models.sqlite_storage import SQLiteStorage
+from models.user import User
+
+EPOCH = datetime(2023, 11, 17)
+
+
+def user_records(count: int) -> dict:
+    """ Return `count` user records by ID, as stored in .db_User.json
+
+    User i was created i seconds after EPOCH and last updated at a
+    shuffled second of the same span.
+    """
+    users = {}
+    for i in range(count):
+        user_id = "user-{}".format(i)
+        users[user_id] = {
+            "id": user_id,
+            "created_at": (EPOCH + timedelta(seconds=i)).strftime(
+                models.base.TIMESTAMP_FORMAT),
+            "updated_at": (EPOCH + timedelta(
+                seconds=i * 7919 % count)).strftime(
+                models.base.TIMESTAMP_FORMAT),
+            "email": "user{}@hbtn.io".format(i),
+            "_password": "0" * 64,
+            "first_name": "First{}".format(i),
+            "last_name": "Last{}".format(i),
+        }
+    return users
+
+
+def populate(count: int):
+    """ Write `count` users to .db_User.json and load them
+    """
+    with open(".db_User.json", "w") as f:
+        json.dump(user_records(count), f)
+    User.load_from_file()
+
+
+def rate(fn: Callable, repeat: int) -> float:
+    """ Call `fn` `repeat` times and return the calls per second
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return repeat / (time.perf_counter() - start)
+
+
+def bench_indexes(sizes: List[int]):
+    """ Equality search by email: index lookup vs full scan
+    """
+    print("{:>10}{:>18}{:>18}".format("users", "indexed/sec", "scan/sec"))
+    for size in sizes:
+        populate(size)
+        email = "user{}@hbtn.io".format(size // 2)
+        indexed = rate(lambda: User.search({'email': email}), 1000)
+        index = User.indexes().pop('email')
+        scan = rate(lambda: User.search({'email': email}), 3)
+        User.indexes()['email'] = index
+        print("{:>10}{:>18,.0f}{:>18,.1f}".format(size, indexed, scan))
+
+
+def bench_query(sizes: List[int]):
+    """ User.query with sorted indexes vs full scan: a 100 user
+    created_at range, an email prefix and the 10 last updated users
+    """
+    print("{:>10}{:>12}{:>20}{:>20}".format(
+        "users", "query", "indexed/sec", "scan/sec"))
+    for size in sizes:
+        populate(size)
+        queries = [
+            ("range", {'created_at__gte': EPOCH + timedelta(
+                seconds=size - 100)}, None, None),
+            ("prefix", {'email__startswith': "user{}".format(
+                size // 1000)}, None, None),
+            ("top-10", {}, '-updated_at', 10),
+        ]
+        for name, filters, order_by, limit in queries:
+            def query():
+                return User.query(filters, order_by, limit)
+
+            def result() -> list:
+                ids = [user.id for user in query()]
+                return ids if order_by else sorted(ids)
+
+            expected = result()
+            indexed = rate(query, 1000)
+            sorted_indexes = User.sorted_indexes()
+            saved = dict(sorted_indexes)
+            sorted_indexes.clear()
+            assert result() == expected
+            scan = rate(query, 3)
+            sorted_indexes.update(saved)
+            print("{:>10}{:>12}{:>20,.0f}{:>20,.1f}".format(
+                size, name, indexed, scan))
+
+
+def bench_journal(sizes: List[int]):
+    """ Write throughput of User.save: snapshot rewrite vs journal append
+    """
+    print("{:>10}{:>18}{:>18}".format("saves", "snapshot/sec", "journal/sec"))
+    for size in sizes:
+        results = []
+        for journal_mode in (False, True):
+            User.load_from_file()
+            models.base.JOURNAL_MODE = journal_mode
+            results.append(rate(lambda: User().save(), size))
+            for f in (".db_User.json", ".db_User.journal"):
+                if os.path.exists(f):
+                    os.remove(f)
+        print("{:>10}{:>18,.0f}{:>18,.0f}".format(size, *results))
+
+
+def bench_bulk(sizes: List[int]):
+    """ Creating users one save at a time vs Base.save_many
+    """
+    print("{:>10}{:>18}{:>18}".format("users", "save()/sec", "save_many/sec"))
+    for size in sizes:
+        User.load_from_file()
+        single = rate(lambda: User().save(), size)
+        User.load_from_file()
+        start = time.perf_counter()
+        User.save_many(User() for _ in range(size))
+        bulk = size / (time.perf_counter() - start)
+        print("{:>10}{:>18,.0f}{:>18,.0f}".format(size, single, bulk))
+        os.remove(".db_User.json")
+
+
+def bench_startup(sizes: List[int]):
+    """ User.load_from_file time: strptime + json, fast path (with
+    orjson if installed) and lazy mode
+    """
+    orjson = models.base.orjson
+    parse_timestamp = models.base.parse_timestamp
+    modes = [
+        ("strptime+json", False, None,
+         lambda value: datetime.strptime(value, models.base.TIMESTAMP_FORMAT)),
+        ("fast path", False, orjson, parse_timestamp),
+        ("lazy", True, orjson, parse_timestamp),
+    ]
+    print("{:>10}".format("users") + "".join(
+        "{:>16}".format(mode[0]) for mode in modes))
+    for size in sizes:
+        populate(size)
+        timings = []
+        for _, lazy, codec, parser in modes:
+            models.base.LAZY_LOAD = lazy
+            models.base.orjson = codec
+            models.base.parse_timestamp = parser
+            start = time.perf_counter()
+            User.load_from_file()
+            timings.append(time.perf_counter() - start)
+        print("{:>10}".format(size) + "".join(
+            "{:>15.2f}s".format(timing) for timing in timings))
+
+
+class DictUser():
+    """ User laid out with a per-instance __dict__, as before __slots__
+    """
+
+    def __init__(self, **kwargs: dict):
+        """ Copy the attributes User.__init__ would set
+        """
+        self.id = kwargs['id']
+        self.created_at = models.base.parse_timestamp(kwargs['created_at'])
+        self.updated_at = models.base.parse_timestamp(kwargs['updated_at'])
+        self.email = kwargs['email']
+        self._password = kwargs['_password']
+        self.first_name = kwargs['first_name']
+        self.last_name = kwargs['last_name']
+
+
+def bench_memory(sizes: List[int]):
+    """ Bytes per loaded user: __dict__ layout, __slots__, lazy raw dict
+
+    The attribute strings are shared with the parsed records, so the
+    figures are the per-object overhead plus the two datetimes.
+    """
+    print("{:>10}{:>18}{:>18}{:>18}".format(
+        "users", "__dict__ B/user", "__slots__ B/user", "lazy B/user"))
+    for size in sizes:
+        populate(size)
+        with open(".db_User.json") as f:
+            records = json.load(f)
+        results = []
+        for build in (lambda: [DictUser(**r) for r in records.values()],
+                      lambda: [User(**r) for r in records.values()],
+                      lambda: [dict(r) for r in records.values()]):
+            tracemalloc.start()
+            objs = build()
+            results.append(tracemalloc.get_traced_memory()[0] / size)
+            tracemalloc.stop()
+            del objs
+        print("{:>10}{:>18,.0f}{:>18,.0f}{:>18,.0f}".format(size, *results))
+
+
+def bench_coldstart(sizes: List[int]):
+    """ Time to load the store and serve the first User.get: eager JSON,
+    lazy JSON and the memory-mapped binary snapshot
+    """
+    modes = [("json", False, 'json'), ("lazy", True, 'json'),
+             ("binary", False, 'binary')]
+    print("{:>10}".format("users") + "".join(
+        "{:>16}".format(mode[0]) for mode in modes) + "{:>16}".format(
+            "binary get/sec"))
+    for size in sizes:
+        populate(size)
+        convert(".db_User.json")
+        user_id = "user-{}".format(size // 2)
+        timings = []
+        for _, lazy, snapshot_format in modes:
+            models.base.LAZY_LOAD = lazy
+            models.base.SNAPSHOT_FORMAT = snapshot_format
+            models.base.DATA.clear()
+            gc.collect()
+            start = time.perf_counter()
+            User.load_from_file()
+            assert User.get(user_id).id == user_id
+            timings.append(time.perf_counter() - start)
+        gets = rate(lambda: User.get("user-{}".format(
+            int.from_bytes(os.urandom(3), 'big') % size)), 10000)
+        print("{:>10}".format(size) + "".join(
+            "{:>15.4f}s".format(timing) for timing in timings)
+            + "{:>16,.0f}".format(gets))
+
+
+def bench_threads(sizes: List[int]):
+    """ Mixed workload from several threads against 10,000 users while
+    another thread keeps rewriting the snapshot
+
+    Each operation is a get, an email search or, one time in ten, the
+    creation or removal of a user (journal mode). Afterwards the store
+    is reloaded from disk and compared with memory.
+    """
+    ops = 20000
+    print("{:>10}{:>14}{:>10}{:>12}".format(
+        "threads", "ops/sec", "errors", "consistent"))
+    for threads in sizes:
+        models.base.JOURNAL_MODE = True
+        populate(10000)
+        errors = []
+        done = threading.Event()
+
+        def work(seed: int):
+            rng = random.Random(seed)
+            created = []
+            try:
+                for i in range(ops // threads):
+                    n = rng.randrange(10000)
+                    if i % 10 == 9:
+                        if created and i % 20 == 19:
+                            created.pop().remove()
+                        else:
+                            user = User(email="new{}-{}@hbtn.io".format(
+                                seed, i))
+                            user.save()
+                            created.append(user)
+                    elif i % 2:
+                        User.get("user-{}".format(n))
+                    else:
+                        User.search({'email': "user{}@hbtn.io".format(n)})
+            except Exception as e:
+                errors.append(e)
+
+        def compact():
+            while not done.is_set():
+                try:
+                    User.save_to_file()
+                except Exception as e:
+                    errors.append(e)
+                time.sleep(0.01)
+
+        compactor = threading.Thread(target=compact)
+        workers = [threading.Thread(target=work, args=(seed,))
+                   for seed in range(threads)]
+        compactor.start()
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        done.set()
+        compactor.join()
+        in_memory = {user.id: user.email for user in User.all()}
+        User.load_from_file()
+        on_disk = {user.id: user.email for user in User.all()}
+        models.base.JOURNALS.pop('User')['file'].close()
+        print("{:>10}{:>14,.0f}{:>10}{:>12}".format(
+            threads, ops / elapsed, len(errors), str(in_memory == on_disk)))
+
+
+def write_from_process(writes: int, barrier, results):
+    """ Worker of bench_processes: create `writes` users in
+    multi-process mode, then report the elapsed time and final count
+    """
+    models.base.MULTIPROCESS = models.base.JOURNAL_MODE = True
+    User.load_from_file()
+    barrier.wait()
+    start = time.perf_counter()
+    for i in range(writes):
+        User(email="{}-{}@hbtn.io".format(os.getpid(), i)).save()
+    elapsed = time.perf_counter() - start
+    barrier.wait()
+    results.put((elapsed, User.count()))
+
+
+def bench_processes(sizes: List[int]):
+    """ Write contention: 4,000 users created by N processes sharing
+    the files of 10,000 users in multi-process mode
+
+    Every process must end up seeing every other process's users.
+    """
+    writes = 4000
+    context = multiprocessing.get_context('fork')
+    print("{:>10}{:>14}{:>12}".format("processes", "saves/sec", "coherent"))
+    for processes in sizes:
+        populate(10000)
+        barrier = context.Barrier(processes)
+        results = context.Queue()
+        workers = [context.Process(target=write_from_process,
+                                   args=(writes // processes, barrier,
+                                         results))
+                   for _ in range(processes)]
+        for worker in workers:
+            worker.start()
+        reports = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        elapsed = max(report[0] for report in reports)
+        expected = 10000 + writes // processes * processes
+        coherent = all(report[1] == expected for report in reports)
+        print("{:>10}{:>14,.0f}{:>12}".format(
+            processes, writes // processes * processes / elapsed,
+            str(coherent)))
+        for f in (".db_User.journal", ".db_User.lock"):
+            os.remove(f)
+
+
+def run_mix(mix: List[tuple], size: int, ops: int) -> float:
+    """ Run `ops` operations drawn from `mix` ((name, weight) pairs)
+    against `size` stored users, return the operations per second
+    """
+    rng = random.Random(0)
+    names = [name for name, weight in mix for _ in range(weight)]
+    created = []
+    start = time.perf_counter()
+    for i in range(ops):
+        name = rng.choice(names)
+        user_id = "user-{}".format(rng.randrange(size))
+        if name == "get":
+            User.get(user_id)
+        elif name == "search":
+            User.search({'email': "user{}@hbtn.io".format(
+                rng.randrange(size))})
+        elif name == "update":
+            user = User.get(user_id)
+            user.first_name = "Updated{}".format(i)
+            user.save()
+        elif name == "create":
+            user = User(email="new{}@hbtn.io".format(i))
+            user.save()
+            created.append(user)
+        elif name == "remove" and created:
+            created.pop().remove()
+    return ops / (time.perf_counter() - start)
+
+
+def bench_storage(sizes: List[int]):
+    """ CRUD mixes on the JSON files (snapshot and journal) and on the
+    SQLite backend
+    """
+    mixes = [
+        ("read-heavy", [("get", 80), ("search", 10), ("update", 10)]),
+        ("write-heavy", [("create", 30), ("update", 30), ("remove", 10),
+                         ("get", 30)]),
+    ]
+    ops = 300
+    print("{:>10}{:>14}".format("users", "backend") + "".join(
+        "{:>16}".format(mix[0] + "/s") for mix in mixes))
+    for size in sizes:
+        for backend in ("json", "json+journal", "sqlite"):
+            models.base.JOURNAL_MODE = backend == "json+journal"
+            models.base.STORAGE = None
+            results = []
+            for _, mix in mixes:
+                if backend == "sqlite":
+                    if os.path.exists(".db.sqlite3"):
+                        os.remove(".db.sqlite3")
+                    models.base.STORAGE = SQLiteStorage(".db.sqlite3")
+                    User.load_from_file()
+                    User.save_many(User(**record)
+                                   for record in user_records(size).values())
+                else:
+                    populate(size)
+                results.append(run_mix(mix, size, ops))
+                if backend != "sqlite":
+                    User.save_to_file()
+            print("{:>10}{:>14}".format(size, backend) + "".join(
+                "{:>16,.0f}".format(result) for result in results))
+    models.base.STORAGE = None
+
+
+BENCHMARKS = {
+    "indexes": (bench_indexes, [10000, 100000, 1000000]),
+    "query": (bench_query, [10000, 100000, 1000000]),
+    "journal": (bench_journal, [1000, 2000, 4000]),
+    "bulk": (bench_bulk, [1000, 2000, 4000]),
+    "startup": (bench_startup, [100000, 1000000]),
+    "memory": (bench_memory, [100000]),
+    "coldstart": (bench_coldstart, [100000, 1000000]),
+    "threads": (bench_threads, [1, 4, 16]),
+    "processes": (bench_processes, [1, 4, 16]),
+    "storage": (bench_storage, [10000]),
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print("Usage: {} <{}> [sizes...]".format(
+            sys.argv[0], "|".join(BENCHMARKS)))
+        sys.exit(1)
+    bench, sizes = BENCHMARKS[sys.argv[1]]
+    sizes = [int(size) for size in sys.argv[2:]] or sizes
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        bench(sizes)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+""" Benchmarks of the session store of SessionExpAuth
+
+Usage: ./bench_sessions.py <benchmark> [sizes...]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import List
+
+from api.v1.auth.session_store import SessionStore
+
+
+def create(sessions, count: int, created_at: datetime = None) -> float:
+    """ Add `count` sessions as SessionExpAuth does, return the seconds
+    """
+    start = time.perf_counter()
+    for i in range(count):
+        sessions["session-{}".format(i)] = {
+            "user_id": "user-{}".format(i),
+            "created_at": created_at or datetime.now()}
+    return time.perf_counter() - start
+
+
+def bench_churn(sizes: List[int]):
+    """ N one-second sessions created, then 2.5 seconds of idling: what
+    is left in the plain dict used before and in the store
+    """
+    print("{:>10}{:>14}{:>14}{:>12}{:>12}{:>12}".format(
+        "sessions", "dict MiB", "store MiB", "dict live", "store live",
+        "expired"))
+    for size in sizes:
+        plain, store = {}, SessionStore(1, 0)
+        memory = []
+        for sessions in (plain, store):
+            gc.collect()
+            tracemalloc.start()
+            create(sessions, size)
+            time.sleep(2.5)
+            memory.append(tracemalloc.get_traced_memory()[0] / 2 ** 20)
+            tracemalloc.stop()
+        print("{:>10}{:>14.1f}{:>14.1f}{:>12}{:>12}{:>12}".format(
+            size, *memory, len(plain), len(store),
+            store.stats()['expired']))
+
+
+def bench_sweep(sizes: List[int]):
+    """ Cost of one sweep evicting N expired sessions out of N + 100,000
+    live ones, and of adding a session
+    """
+    print("{:>10}{:>12}{:>16}{:>16}{:>16}".format(
+        "expired", "sweep ms", "ns per expired", "dict set/sec",
+        "store set/sec"))
+    for size in sizes:
+        sessions = SessionStore(3600, 0, sweeper=False)
+        create(sessions, size, datetime.now() - timedelta(hours=2))
+        start = time.perf_counter()
+        for i in range(100000):
+            sessions["live-{}".format(i)] = {
+                "user_id": "user-{}".format(i), "created_at": datetime.now()}
+        store = 100000 / (time.perf_counter() - start)
+        start = time.perf_counter()
+        evicted = sessions.sweep()
+        sweep = time.perf_counter() - start
+        assert evicted == size and len(sessions) == 100000
+        plain = 100000 / create({}, 100000)
+        print("{:>10}{:>12.1f}{:>16,.0f}{:>16,.0f}{:>16,.0f}".format(
+            size, sweep * 1000, sweep * 1e9 / size, plain, store))
+
+
+def bench_cap(sizes: List[int]):
+    """ N sessions created in a store capped at 10,000: live and evicted
+    """
+    print("{:>10}{:>12}{:>12}{:>16}".format(
+        "sessions", "live", "evicted", "set/sec"))
+    for size in sizes:
+        sessions = SessionStore(3600, 10000)
+        elapsed = create(sessions, size)
+        stats = sessions.stats()
+        print("{:>10}{:>12}{:>12}{:>16,.0f}".format(
+            size, stats['live'], stats['evicted'], size / elapsed))
+
+
+BENCHMARKS = {
+    "churn": (bench_churn, [10000, 100000]),
+    "sweep": (bench_sweep, [1000, 10000, 100000]),
+    "cap": (bench_cap, [10000, 100000, 1000000]),
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print("Usage: {} <{}> [sizes...]".format(
+            sys.argv[0], "|".join(BENCHMARKS)))
+        sys.exit(1)
+    bench, sizes = BENCHMARKS[sys.argv[1]]
+    sizes = [int(size) for size in sys.argv[2:]] or sizes
+    bench(sizes)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+""" Main 5
+
+Journal recovery: a save made after a crash in the middle of an append
+must still be there after the next restart. Each step runs in its own
+process, in a temporary directory, with MODELS_JOURNAL=1.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+
+def crash():
+    """ Save a user, then die halfway through appending another one """
+    User(email="before@hbtn.io").save()
+    with open(".db_User.journal", "ab") as f:
+        f.write(b'{"op": "save", "obj": {"id": "torn", "ema')
+    os._exit(0)
+
+
+def save():
+    """ Restart and save a user """
+    User.load_from_file()
+    assert len(User.search({'email': "before@hbtn.io"})) == 1
+    User(email="after@hbtn.io").save()
+
+
+def check():
+    """ Restart and look both users up """
+    User.load_from_file()
+    for email in ("before@hbtn.io", "after@hbtn.io"):
+        users = User.search({'email': email})
+        assert len(users) == 1, "{} was lost".format(email)
+        print("{}: {}".format(email, users[0].id))
+    assert User.get("torn") is None
+
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    from models.user import User
+    {'crash': crash, 'save': save, 'check': check}[sys.argv[1]]()
+elif __name__ == "__main__":
+    env = dict(os.environ, MODELS_JOURNAL='1')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for step in ('crash', 'save', 'check'):
+            subprocess.run([sys.executable, os.path.abspath(__file__), step],
+                           cwd=tmp_dir, env=env, check=True)
+    print("OK")
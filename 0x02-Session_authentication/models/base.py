@@ -1,21 +1,173 @@
 #!/usr/bin/env python3
 """ Base module
 """
+from contextlib import contextmanager
 from datetime import datetime
-from typing import TypeVar, List, Iterable
-from os import path
+from typing import TypeVar, List, Iterable, Iterator
+from os import getenv, path
+import heapq
+import itertools
 import json
+import operator
+import os
+import threading
+import time
 import uuid
 
+from models.index import Index, SortedIndex
+from models.rwlock import RWLock
+from models.shared import SharedState
+from models.snapshot import Snapshot, SnapshotTable
+from models.sqlite_storage import SQLiteStorage
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATA = {}
+INDEXES = {}
+SORTED_INDEXES = {}
+FIELDS = {}
+MULTIPROCESS = getenv('MODELS_MULTIPROCESS', '0') == '1'
+JOURNAL_MODE = getenv('MODELS_JOURNAL', '0') == '1' or MULTIPROCESS
+LAZY_LOAD = getenv('MODELS_LAZY_LOAD', '0') == '1'
+SNAPSHOT_FORMAT = getenv('MODELS_SNAPSHOT_FORMAT', 'json')
+COMPACT_INTERVAL = float(getenv('MODELS_COMPACT_INTERVAL', '60'))
+SEARCH_BATCH_SIZE = 1000
+QUERY_OPERATORS = {
+    'eq': operator.eq,
+    'ne': operator.ne,
+    'lt': operator.lt,
+    'lte': operator.le,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'startswith': lambda value, prefix: value.startswith(prefix),
+    'in': lambda value, values: value in values,
+}
+JOURNALS = {}
+SHARED = {}
+SYNCED = {}
+STORAGE_BACKENDS = {
+    'sqlite': SQLiteStorage,
+}
+STORAGE_NAME = getenv('MODELS_STORAGE', 'json')
+if STORAGE_NAME != 'json' and STORAGE_NAME not in STORAGE_BACKENDS:
+    raise ValueError("Unknown MODELS_STORAGE {!r}, expected one of: {}"
+                     .format(STORAGE_NAME,
+                             ", ".join(['json'] + sorted(STORAGE_BACKENDS))))
+STORAGE = STORAGE_BACKENDS[STORAGE_NAME]() \
+    if STORAGE_NAME in STORAGE_BACKENDS else None
+_data_lock = RWLock()
+_fill_lock = threading.RLock()
+_save_lock = threading.RLock()
+_journal_lock = threading.RLock()
+_compactor = None
+_transaction = threading.local()
+
+
+def json_loads(data: bytes):
+    """ Decode JSON, with orjson when it is installed
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj) -> bytes:
+    """ Encode JSON to UTF-8 bytes, with orjson when it is installed
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ Parse a TIMESTAMP_FORMAT string
+
+    Well-formed values take the C `fromisoformat` fast path; anything
+    else falls back to `strptime`, which also raises the usual errors.
+    """
+    if len(value) == 19 and value[10] == 'T':
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+def _compact_journals():
+    """ Periodically fold every journal with new entries into its snapshot
+    """
+    while True:
+        time.sleep(COMPACT_INTERVAL)
+        with _journal_lock:
+            classes = [journal['cls'] for journal in JOURNALS.values()
+                       if journal['entries'] > 0]
+        for cls in classes:
+            cls.save_to_file()
 
 
 class Base():
     """ Base class
+
+    Subclasses list the attributes to keep a secondary index on in
+    `indexed_attributes`; `search` uses them for equality lookups.
+    Attributes in `sorted_attributes` get an ordered index that `query`
+    uses for ranges, prefixes and ordering. Indexes reflect the values
+    objects had when last saved.
+
+    With MODELS_JOURNAL=1, `save` and `remove` append one JSON line to
+    `.db_<Class>.journal` instead of rewriting `.db_<Class>.json`; a
+    background thread folds the journal into the snapshot every
+    MODELS_COMPACT_INTERVAL seconds.
+
+    Inside `with Base.transaction():` mutations only touch `DATA` and
+    each modified class is written out once when the block exits.
+
+    With MODELS_LAZY_LOAD=1, `load_from_file` keeps the raw JSON dicts
+    in `DATA` and builds an object only when `get` or `search` returns
+    it; untouched records are written back as they were read.
+
+    Stored attributes are declared in `__slots__` so instances carry no
+    per-object `__dict__`; a subclass that does not declare its own
+    slots gets one back and keeps working unchanged.
+
+    The public `to_json` form is served from a per-object cache that
+    any attribute write clears (in-place changes to a mutable value are
+    not seen), so listing unchanged objects skips the timestamp
+    formatting. Saves build the form with private attributes afresh.
+
+    With MODELS_SNAPSHOT_FORMAT=binary, snapshots are written to
+    `.db_<Class>.bin` (see models.snapshot) and memory-mapped on load:
+    only the header is read up front and `get` decodes a single record.
+    Secondary indexes are built the first time they are needed.
+
+    `DATA` is guarded by a readers-writer lock: `get`, `count`, `search`
+    and `save_to_file` share it, `load_from_file`, `save` and `remove`
+    take it exclusively. Readers that hydrate a record or build an
+    index serialize on a separate lock so they never block on writes.
+
+    With MODELS_MULTIPROCESS=1 (which implies the journal) several
+    processes can share the files. Writes hold an exclusive `fcntl`
+    lock on `.db_<Class>.lock` and publish the new journal size in its
+    header; before each read or write a process compares that header
+    with what it has applied and replays only the journal lines other
+    processes added. A full reload is only needed when another process
+    compacted the journal while this one was behind.
+
+    With MODELS_STORAGE set to a name in STORAGE_BACKENDS (`sqlite`),
+    `save`, `remove`, `get`, `search`, `count`, `all` and
+    `transaction` are handed to that backend (see models.storage) and
+    none of the above applies.
     """
 
+    __slots__ = ('id', 'created_at', 'updated_at', '_json_cache')
+    indexed_attributes = ()
+    sorted_attributes = ('created_at', 'updated_at')
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
@@ -25,13 +177,11 @@ class Base():
 
         self.id = kwargs.get('id', str(uuid.uuid4()))
         if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+            self.created_at = parse_timestamp(kwargs.get('created_at'))
         else:
             self.created_at = datetime.utcnow()
         if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+            self.updated_at = parse_timestamp(kwargs.get('updated_at'))
         else:
             self.updated_at = datetime.utcnow()
 
@@ -44,69 +194,549 @@ class Base():
             return False
         return (self.id == other.id)
 
+    def __setattr__(self, name: str, value):
+        """ Set an attribute and drop the cached JSON form
+        """
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, '_json_cache', None)
+
     def to_json(self, for_serialization: bool = False) -> dict:
         """ Convert the object a JSON dictionary
         """
+        if not for_serialization:
+            return dict(self.json_form())
         result = {}
-        for key, value in self.__dict__.items():
-            if not for_serialization and key[0] == '_':
-                continue
+        for key, value in self.attributes():
             if type(value) is datetime:
-                result[key] = value.strftime(TIMESTAMP_FORMAT)
-            else:
-                result[key] = value
+                value = value.strftime(TIMESTAMP_FORMAT)
+            result[key] = value
         return result
 
+    def json_form(self) -> dict:
+        """ Return the cached public JSON dictionary of the object, built
+        again after any attribute write; callers must not modify it
+
+        Only the public form is kept: the one with private attributes is
+        built once per save, and caching it would hold a second copy of
+        every object after each snapshot. A form built while another
+        thread writes an attribute is not kept, so the cache never
+        outlives a write.
+        """
+        cache = getattr(self, '_json_cache', None)
+        if type(cache) is not dict:
+            token = object()
+            object.__setattr__(self, '_json_cache', token)
+            cache = {}
+            for key, value in self.attributes():
+                if key[0] == '_':
+                    continue
+                if type(value) is datetime:
+                    value = value.strftime(TIMESTAMP_FORMAT)
+                cache[key] = value
+            if self._json_cache is token:
+                object.__setattr__(self, '_json_cache', cache)
+        return cache
+
+    @classmethod
+    def fields(cls) -> tuple:
+        """ Return the slot names of the class, base classes first
+        """
+        names = FIELDS.get(cls)
+        if names is None:
+            names = tuple(
+                name for klass in reversed(cls.__mro__)
+                for name in klass.__dict__.get('__slots__', ())
+                if name not in ('__dict__', '__weakref__', '_json_cache'))
+            FIELDS[cls] = names
+        return names
+
+    def attributes(self) -> Iterable[tuple]:
+        """ Return the (name, value) pairs of the set attributes
+        """
+        items = []
+        for name in self.fields():
+            try:
+                items.append((name, getattr(self, name)))
+            except AttributeError:
+                continue
+        items.extend(getattr(self, '__dict__', {}).items())
+        return items
+
     @classmethod
     def load_from_file(cls):
         """ Load all objects from file
         """
+        if STORAGE is not None:
+            STORAGE.load(cls)
+            return
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
+        bin_path = ".db_{}.bin".format(s_class)
+        with _data_lock.write(), cls.process_lock() as state:
+            DATA[s_class] = {}
+            if SNAPSHOT_FORMAT == 'binary' and path.exists(bin_path):
+                DATA[s_class] = SnapshotTable(Snapshot(bin_path), json_loads)
+            elif path.exists(file_path):
+                with open(file_path, 'rb') as f:
+                    objs_json = json_loads(f.read())
+                if LAZY_LOAD:
+                    DATA[s_class] = objs_json
+                else:
+                    for obj_id, obj_json in objs_json.items():
+                        DATA[s_class][obj_id] = cls(**obj_json)
+            end = cls.replay_journal()
+            if state is not None:
+                SYNCED[s_class] = (state.read()[0], end)
+            INDEXES.pop(s_class, None)
+            SORTED_INDEXES.pop(s_class, None)
+
+    @classmethod
+    def replay_journal(cls, start: int = 0, skip: Iterable[str] = ()) -> int:
+        """ Apply the journal entries written since the last snapshot
+
+        Reading begins at byte `start` and entries about the IDs in
+        `skip` are ignored; returns the offset reached. A last line
+        without its newline, left by a crash in the middle of an
+        append, is cut off so that the next append starts a new line.
+        """
+        s_class = cls.__name__
+        journal_path = ".db_{}.journal".format(s_class)
+        if not path.exists(journal_path):
+            return 0
+
+        end = start
+        with open(journal_path, 'rb') as f:
+            f.seek(start)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                end += len(line)
+                try:
+                    entry = json_loads(line)
+                except ValueError:
+                    continue
+                if cls.entry_id(entry) not in skip:
+                    cls.apply_entry(entry)
+            if os.fstat(f.fileno()).st_size > end:
+                with _journal_lock:
+                    f.seek(end)
+                    if b'\n' not in f.read():
+                        os.truncate(journal_path, end)
+        return end
+
+    @staticmethod
+    def entry_id(entry: dict) -> str:
+        """ Return the ID of the object a journal entry is about
+        """
+        if entry.get('op') == 'save':
+            return entry['obj']['id']
+        return entry.get('id')
+
+    @classmethod
+    def apply_entry(cls, entry: dict):
+        """ Apply one journal entry to `DATA` and to built indexes
+        """
+        s_class = cls.__name__
+        indexed = INDEXES.get(s_class) is not None
+        if entry.get('op') == 'save':
+            obj_json = entry['obj']
+            obj = obj_json if LAZY_LOAD else cls(**obj_json)
+            DATA[s_class][obj_json['id']] = obj
+            if indexed:
+                cls.update_indexes(obj_json['id'], obj)
+        elif entry.get('op') == 'remove':
+            DATA[s_class].pop(entry['id'], None)
+            if indexed:
+                cls.update_indexes(entry['id'])
+
+    @classmethod
+    def append_to_journal(cls, entries: List[dict]):
+        """ Append mutations to the journal of the class in one write
+
+        In multi-process mode the changes of other processes are applied
+        first, except those about the objects being written, which the
+        new entries supersede.
+        """
+        s_class = cls.__name__
+        if not MULTIPROCESS:
+            cls.write_journal(entries)
+            return
+        with _data_lock.write(), cls.process_lock(exclusive=True) as state:
+            ids = {cls.entry_id(entry) for entry in entries}
+            if not cls.catch_up(ids):
+                for entry in entries:
+                    cls.apply_entry(entry)
+            end = cls.write_journal(entries)
+            generation, _, compacted = state.read()
+            state.write(generation, end, compacted)
+            SYNCED[s_class] = (generation, end)
+
+    @classmethod
+    def write_journal(cls, entries: List[dict]) -> int:
+        """ Write entries to the journal file, return its new size
+        """
+        global _compactor
+        s_class = cls.__name__
+        with _journal_lock:
+            journal = JOURNALS.get(s_class)
+            if journal is None:
+                journal_path = ".db_{}.journal".format(s_class)
+                journal = {'file': open(journal_path, 'ab'),
+                           'cls': cls, 'entries': 0}
+                JOURNALS[s_class] = journal
+            journal['file'].write(b''.join(
+                json_dumps(entry) + b'\n' for entry in entries))
+            journal['file'].flush()
+            journal['entries'] += len(entries)
+            if _compactor is None:
+                _compactor = threading.Thread(target=_compact_journals,
+                                              daemon=True)
+                _compactor.start()
+            return os.fstat(journal['file'].fileno()).st_size
+
+    @classmethod
+    @contextmanager
+    def process_lock(cls, exclusive: bool = False):
+        """ Hold the file lock shared with other processes
+
+        Yields the class's SharedState, or None outside multi-process
+        mode. A process forked after opening it opens its own.
+        """
+        if not MULTIPROCESS:
+            yield None
             return
+        s_class = cls.__name__
+        with _journal_lock:
+            state = SHARED.get(s_class)
+            if state is None or state.pid != os.getpid():
+                state = SharedState(".db_{}.lock".format(s_class))
+                SHARED[s_class] = state
+            with state.lock(exclusive):
+                yield state
+
+    @classmethod
+    def catch_up(cls, skip: Iterable[str] = ()) -> bool:
+        """ Apply the journal lines other processes wrote since the
+        last sync, or reload everything if they cannot be told apart
+
+        The data and process locks must be held. Returns False after a
+        full reload.
+        """
+        s_class = cls.__name__
+        generation, end, compacted = SHARED[s_class].read()
+        known, offset = SYNCED.get(s_class, (None, None))
+        if generation == known:
+            start = offset
+        elif known is not None and generation == known + 1 \
+                and offset == compacted:
+            start = 0
+            journal = JOURNALS.get(s_class)
+            if journal is not None:
+                journal['entries'] = 0
+        else:
+            cls.load_from_file()
+            return False
+        if start != end:
+            SYNCED[s_class] = (generation, cls.replay_journal(start, skip))
+        else:
+            SYNCED[s_class] = (generation, end)
+        return True
+
+    @classmethod
+    def sync(cls):
+        """ Bring `DATA` up to date with the writes of other processes
+
+        Costs one read of the mapped header when nothing changed.
+        """
+        if not MULTIPROCESS:
+            return
+        s_class = cls.__name__
+        state = SHARED.get(s_class)
+        synced = SYNCED.get(s_class)
+        if state is not None and synced is not None \
+                and state.pid == os.getpid() and state.read()[:2] == synced:
+            return
+        with _data_lock.write(), cls.process_lock():
+            cls.catch_up()
+
+    @classmethod
+    def indexes(cls) -> dict:
+        """ Return the secondary indexes of the class by attribute
+        """
+        s_class = cls.__name__
+        indexes = INDEXES.get(s_class)
+        if indexes is None:
+            with _fill_lock:
+                indexes = INDEXES.get(s_class)
+                if indexes is None:
+                    indexes = {attribute: Index(attribute)
+                               for attribute in cls.indexed_attributes}
+                    objs = DATA.get(s_class, {})
+                    for obj_id, obj in objs.items():
+                        for attribute, index in indexes.items():
+                            index.add(obj_id,
+                                      cls.attribute_of(obj, attribute))
+                    sorted_indexes = {}
+                    for attribute in cls.sorted_attributes:
+                        index = SortedIndex(attribute)
+                        index.fill((obj_id, cls.attribute_of(obj, attribute))
+                                   for obj_id, obj in objs.items())
+                        sorted_indexes[attribute] = index
+                    SORTED_INDEXES[s_class] = sorted_indexes
+                    INDEXES[s_class] = indexes
+        return indexes
+
+    @classmethod
+    def sorted_indexes(cls) -> dict:
+        """ Return the sorted indexes of the class by attribute
+        """
+        cls.indexes()
+        return SORTED_INDEXES[cls.__name__]
+
+    @classmethod
+    def update_indexes(cls, obj_id: str, obj=None):
+        """ Index `obj` under `obj_id` in every index of the class, or
+        drop `obj_id` from them when `obj` is None
+        """
+        for index in itertools.chain(cls.indexes().values(),
+                                     cls.sorted_indexes().values()):
+            if obj is None:
+                index.discard(obj_id)
+            else:
+                try:
+                    value = cls.attribute_of(obj, index.attribute)
+                except AttributeError:
+                    value = None
+                index.add(obj_id, value)
+
+    @classmethod
+    def rebuild_indexes(cls):
+        """ Rebuild the secondary indexes from all stored objects
+        """
+        with _data_lock.write():
+            INDEXES.pop(cls.__name__, None)
+            SORTED_INDEXES.pop(cls.__name__, None)
+            cls.indexes()
+
+    @classmethod
+    def attribute_of(cls, obj, attribute: str):
+        """ Read an attribute from an object or from a raw JSON record
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+        Raw records are answered from the dict when the attribute is
+        stored as-is; timestamps are parsed and anything else (e.g. a
+        property) is read from the hydrated object.
+        """
+        if type(obj) is not dict:
+            return getattr(obj, attribute)
+        if attribute in ('created_at', 'updated_at'):
+            value = obj.get(attribute)
+            return parse_timestamp(value) if value is not None else None
+        if attribute in obj:
+            return obj[attribute]
+        return getattr(cls.hydrate(obj['id']), attribute)
+
+    @classmethod
+    def hydrate(cls, obj_id: str) -> TypeVar('Base'):
+        """ Return the stored object, building it from its raw record
+        """
+        s_class = cls.__name__
+        obj = DATA[s_class].get(obj_id)
+        if type(obj) is dict:
+            with _fill_lock:
+                obj = DATA[s_class].get(obj_id)
+                if type(obj) is dict:
+                    obj = cls(**obj)
+                    DATA[s_class][obj_id] = obj
+        return obj
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
+
+        In multi-process mode the other processes' changes are applied
+        first, and the lock is held until the journal is emptied.
+        """
+        if STORAGE is not None:
+            return
+        if not MULTIPROCESS:
+            cls.compact()
+            return
+        with _data_lock.write(), _save_lock, \
+                cls.process_lock(exclusive=True) as state:
+            cls.catch_up()
+            generation, end, _ = state.read()
+            cls.compact()
+            state.write(generation + 1, 0, end)
+            SYNCED[cls.__name__] = (generation + 1, 0)
+
+    @classmethod
+    def compact(cls):
+        """ Write the snapshot and drop the journal entries it covers
+
+        The snapshot is written to a temporary file and moved into
+        place. The JSON format only holds the read lock while it copies
+        the object list, so writers are not held up by the serialization.
         """
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        journal_path = ".db_{}.journal".format(s_class)
+        with _data_lock.read():
+            _save_lock.acquire()
+            try:
+                with _journal_lock:
+                    journal = JOURNALS.get(s_class)
+                    covered = os.fstat(journal['file'].fileno()).st_size \
+                        if journal is not None else None
+                if SNAPSHOT_FORMAT == 'binary':
+                    cls.save_to_snapshot()
+                else:
+                    objs = list(DATA[s_class].items())
+            except BaseException:
+                _save_lock.release()
+                raise
+        try:
+            if SNAPSHOT_FORMAT != 'binary':
+                objs_json = {}
+                for obj_id, obj in objs:
+                    if type(obj) is dict:
+                        objs_json[obj_id] = obj
+                    else:
+                        objs_json[obj_id] = obj.to_json(True)
+
+                with open(file_path + '.tmp', 'wb') as f:
+                    f.write(json_dumps(objs_json))
+                os.replace(file_path + '.tmp', file_path)
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+            with _journal_lock:
+                if journal is not None:
+                    cls.trim_journal(journal, covered)
+                elif path.exists(journal_path):
+                    open(journal_path, 'w').close()
+        finally:
+            _save_lock.release()
+
+    @classmethod
+    def trim_journal(cls, journal: dict, covered: int):
+        """ Drop the first `covered` bytes of an open journal
+        """
+        journal_file = journal['file']
+        tail = b''
+        if os.fstat(journal_file.fileno()).st_size > covered:
+            with open(journal_file.name, 'rb') as f:
+                f.seek(covered)
+                tail = f.read()
+        journal_file.truncate(0)
+        journal_file.write(tail)
+        journal_file.flush()
+        journal['entries'] = tail.count(b'\n')
+
+    @classmethod
+    def save_to_snapshot(cls):
+        """ Write all objects to the binary snapshot file
+
+        Records the process has not touched are copied over as the
+        bytes they were read as.
+        """
+        s_class = cls.__name__
+        objs = DATA[s_class]
+
+        def encode(obj) -> bytes:
+            return json_dumps(obj if type(obj) is dict
+                              else obj.to_json(True))
+
+        if isinstance(objs, SnapshotTable):
+            records = objs.records(encode)
+        else:
+            records = ((obj_id, encode(obj)) for obj_id, obj in objs.items())
+        Snapshot.write(".db_{}.bin".format(s_class), records)
 
     def save(self):
         """ Save current object
         """
+        if STORAGE is not None:
+            self.updated_at = datetime.utcnow()
+            STORAGE.save(self)
+            return
         s_class = self.__class__.__name__
-        self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        with _data_lock.write():
+            self.updated_at = datetime.utcnow()
+            DATA[s_class][self.id] = self
+            self.update_indexes(self.id, self)
+            self.__class__.persist({'op': 'save', 'obj': self})
 
     def remove(self):
         """ Remove object
         """
+        if STORAGE is not None:
+            STORAGE.remove(self)
+            return
         s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        with _data_lock.write():
+            if DATA[s_class].get(self.id) is not None:
+                del DATA[s_class][self.id]
+                self.update_indexes(self.id)
+                self.__class__.persist({'op': 'remove', 'id': self.id})
+
+    @classmethod
+    def persist(cls, entry: dict):
+        """ Write one mutation to disk, or buffer it in a transaction
+        """
+        if JOURNAL_MODE and entry['op'] == 'save':
+            entry['obj'] = entry['obj'].to_json(True)
+        pending = getattr(_transaction, 'pending', None)
+        if pending is not None:
+            entries = pending.setdefault(cls, [])
+            if JOURNAL_MODE:
+                entries.append(entry)
+        elif JOURNAL_MODE:
+            cls.append_to_journal([entry])
+        else:
+            cls.save_to_file()
+
+    @classmethod
+    @contextmanager
+    def transaction(cls):
+        """ Buffer the mutations of the current thread until exit
+
+        Nested blocks join the outermost one. Changes to `DATA` are not
+        rolled back on error; whatever was applied is still written.
+        """
+        if STORAGE is not None:
+            with STORAGE.transaction():
+                yield
+            return
+        if getattr(_transaction, 'pending', None) is not None:
+            yield
+            return
+        _transaction.pending = {}
+        try:
+            yield
+        finally:
+            pending, _transaction.pending = _transaction.pending, None
+            for s_cls, entries in pending.items():
+                if JOURNAL_MODE:
+                    s_cls.append_to_journal(entries)
+                else:
+                    s_cls.save_to_file()
+
+    @classmethod
+    def save_many(cls, objs: Iterable[TypeVar('Base')]):
+        """ Save several objects with a single write per class
+        """
+        with cls.transaction():
+            for obj in objs:
+                obj.save()
 
     @classmethod
     def count(cls) -> int:
         """ Count all objects
         """
+        if STORAGE is not None:
+            return STORAGE.count(cls)
         s_class = cls.__name__
-        return len(DATA[s_class].keys())
+        cls.sync()
+        with _data_lock.read():
+            return len(DATA[s_class].keys())
 
     @classmethod
     def all(cls) -> Iterable[TypeVar('Base')]:
@@ -118,20 +748,213 @@ class Base():
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
         """
-        s_class = cls.__name__
-        return DATA[s_class].get(id)
+        if STORAGE is not None:
+            return STORAGE.get(cls, id)
+        cls.sync()
+        with _data_lock.read():
+            return cls.hydrate(id)
 
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
         """
+        return list(cls.iter_search(attributes))
+
+    @classmethod
+    def iter_search(cls, attributes: dict = {}, cursor: str = None,
+                    limit: int = None) -> Iterator[TypeVar('Base')]:
+        """ Yield the objects with matching attributes one at a time
+
+        Equality on an indexed attribute narrows the candidates down to
+        the matching IDs instead of scanning every object. Only IDs
+        greater than `cursor` are considered; with `limit`, the `limit`
+        lowest of them are yielded in ID order (keyset pagination).
+        Objects are built SEARCH_BATCH_SIZE at a time, so callers that
+        stream them never hold all of them at once.
+        """
+        if STORAGE is not None:
+            yield from STORAGE.iter_search(cls, attributes, cursor, limit)
+            return
         s_class = cls.__name__
+
         def _search(obj):
             if len(attributes) == 0:
                 return True
             for k, v in attributes.items():
-                if (getattr(obj, k) != v):
+                if (cls.attribute_of(obj, k) != v):
                     return False
             return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+
+        cls.sync()
+        with _data_lock.read():
+            objs = DATA[s_class]
+            candidates = None
+            indexes = cls.indexes()
+            for k, v in attributes.items():
+                if k not in indexes:
+                    continue
+                ids = indexes[k].lookup(v)
+                if ids is not None and (candidates is None
+                                        or len(ids) < len(candidates)):
+                    candidates = ids
+            if candidates is not None:
+                objs = {obj_id: objs[obj_id]
+                        for obj_id in candidates if obj_id in objs}
+
+            ids = (obj_id for obj_id, obj in objs.items()
+                   if (cursor is None or obj_id > cursor) and _search(obj))
+            if limit is None:
+                ids = list(ids)
+            else:
+                ids = heapq.nsmallest(limit, ids)
+
+        for start in range(0, len(ids), SEARCH_BATCH_SIZE):
+            with _data_lock.read():
+                batch = [cls.hydrate(obj_id)
+                         for obj_id in ids[start:start + SEARCH_BATCH_SIZE]]
+            for obj in batch:
+                if obj is not None:
+                    yield obj
+
+    @classmethod
+    def query(cls, filters: dict = {}, order_by: str = None,
+              limit: int = None) -> List[TypeVar('Base')]:
+        """ Return the objects matching `filters`, ordered and limited
+
+        Filter keys are an attribute (equality) or `<attribute>__<op>`
+        with <op> a key of QUERY_OPERATORS, e.g. `created_at__gte` or
+        `email__startswith`; timestamps may be given as strings.
+        `order_by` names an attribute, prefixed with '-' for descending
+        order; None values sort first and ties are ordered by ID.
+
+        Candidates come from the narrowest of the hash index of an
+        equality and the sorted index of a range or prefix. Without
+        either, the sorted index of `order_by` is walked in order and
+        the walk stops after `limit` matches; only filters and orders on
+        attributes without an index scan every object.
+        """
+        conditions = cls.parse_filters(filters)
+        if STORAGE is not None:
+            return STORAGE.query(cls, conditions, order_by, limit)
+        reverse = order_by is not None and order_by.startswith('-')
+        order_attribute = order_by.lstrip('-') if order_by else None
+        s_class = cls.__name__
+        cls.sync()
+        with _data_lock.read():
+            objs = DATA[s_class]
+            ids, ordered = cls.plan_query(conditions, order_attribute,
+                                          reverse)
+            if ids is None:
+                items = objs.items()
+            else:
+                items = ((obj_id, objs.get(obj_id)) for obj_id in ids)
+            found = (obj_id for obj_id, obj in items
+                     if obj is not None and cls.matches(obj, conditions))
+
+            if order_attribute is not None and not ordered:
+                def key(obj_id: str) -> tuple:
+                    value = cls.attribute_of(objs[obj_id], order_attribute)
+                    return (value is not None, value, obj_id)
+
+                if limit is None:
+                    found = sorted(found, key=key, reverse=reverse)
+                elif reverse:
+                    found = heapq.nlargest(limit, found, key=key)
+                else:
+                    found = heapq.nsmallest(limit, found, key=key)
+            elif limit is not None:
+                found = itertools.islice(found, limit)
+            return [cls.hydrate(obj_id) for obj_id in found]
+
+    @classmethod
+    def parse_filters(cls, filters: dict) -> List[tuple]:
+        """ Turn query filters into (attribute, operator, operand)
+        """
+        conditions = []
+        for key, operand in filters.items():
+            attribute, _, op = key.rpartition('__')
+            if not attribute or op not in QUERY_OPERATORS:
+                attribute, op = key, 'eq'
+            if attribute in ('created_at', 'updated_at'):
+                if op == 'in':
+                    operand = [parse_timestamp(value) if type(value) is str
+                               else value for value in operand]
+                elif type(operand) is str:
+                    operand = parse_timestamp(operand)
+            conditions.append((attribute, op, operand))
+        return conditions
+
+    @classmethod
+    def matches(cls, obj, conditions: List[tuple]) -> bool:
+        """ Tell whether an object or raw record meets every condition
+
+        Only `eq`, `ne` and `in` match a missing (None) value; values
+        that cannot be compared with the operand do not match.
+        """
+        for attribute, op, operand in conditions:
+            try:
+                value = cls.attribute_of(obj, attribute)
+            except AttributeError:
+                value = None
+            if value is None and op not in ('eq', 'ne', 'in'):
+                return False
+            try:
+                if not QUERY_OPERATORS[op](value, operand):
+                    return False
+            except (TypeError, AttributeError):
+                return False
+        return True
+
+    @classmethod
+    def plan_query(cls, conditions: List[tuple], order_attribute: str,
+                   reverse: bool) -> tuple:
+        """ Pick where the candidates of a query come from
+
+        Return (IDs, ordered): IDs is None for a full scan, and ordered
+        tells whether the IDs come in `order_attribute` order.
+        """
+        indexes = cls.indexes()
+        sorted_indexes = cls.sorted_indexes()
+        best = None
+        for attribute, op, operand in conditions:
+            if op == 'eq' and attribute in indexes:
+                ids = indexes[attribute].lookup(operand)
+                if ids is not None and (best is None or len(ids) < best[0]):
+                    best = (len(ids), ids, False)
+                continue
+            index = sorted_indexes.get(attribute)
+            bounds = cls.range_bounds(op, operand)
+            if index is None or bounds is None:
+                continue
+            try:
+                size = index.count(**bounds)
+            except TypeError:
+                continue
+            if best is None or size < best[0]:
+                best = (size, index.range(reverse=reverse, **bounds),
+                        attribute == order_attribute)
+        if best is not None:
+            return best[1], best[2]
+        if order_attribute in sorted_indexes:
+            return sorted_indexes[order_attribute].ordered(reverse), True
+        return None, False
+
+    @staticmethod
+    def range_bounds(op: str, operand) -> dict:
+        """ Return the `SortedIndex.range` bounds covering a condition,
+        or None if a sorted index cannot narrow it down
+        """
+        if operand is None:
+            return None
+        if op == 'eq':
+            return {'low': operand, 'high': operand}
+        if op in ('lt', 'lte'):
+            return {'high': operand, 'high_inclusive': op == 'lte'}
+        if op in ('gt', 'gte'):
+            return {'low': operand, 'low_inclusive': op == 'gte'}
+        if op == 'startswith' and type(operand) is str:
+            if not operand or ord(operand[-1]) == 0x10ffff:
+                return {'low': operand}
+            return {'low': operand, 'high_inclusive': False,
+                    'high': operand[:-1] + chr(ord(operand[-1]) + 1)}
+        return None
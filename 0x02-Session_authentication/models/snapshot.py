@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+""" Snapshot module
+
+Binary, memory-mapped snapshot format for the file-backed models:
+
+    header   magic, version, id width, record count, index offset
+    records  one compact JSON document per object, back to back
+    index    (id, offset, length) entries of fixed width, sorted by id
+
+Opening a snapshot only reads the header; looking an object up is a
+binary search over the index followed by a read of its record.
+
+Usage: ./models/snapshot.py .db_User.json [...]
+converts JSON snapshots into `.db_<Class>.bin` files.
+"""
+from collections.abc import MutableMapping
+from typing import Callable, Iterable, Iterator, Tuple
+import json
+import mmap
+import os
+import struct
+import sys
+
+
+MAGIC = b'HBDB'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQQ')
+
+
+class Snapshot():
+    """ Read-only view of a binary snapshot file
+    """
+
+    def __init__(self, file_path: str):
+        """ Map `file_path` and read its header
+        """
+        self.file_path = file_path
+        with open(file_path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, id_width, count, index_offset = \
+            HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{} is not a snapshot file".format(file_path))
+        self._id_width = id_width
+        self._count = count
+        self._index_offset = index_offset
+        self._entry = struct.Struct('<{}sQI'.format(id_width))
+
+    @classmethod
+    def write(cls, file_path: str, records: Iterable[Tuple[str, bytes]]):
+        """ Write (id, encoded record) pairs as a snapshot file
+        """
+        entries = []
+        tmp_path = file_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(b'\0' * HEADER.size)
+            offset = HEADER.size
+            for obj_id, record in records:
+                entries.append((obj_id.encode('utf-8'), offset, len(record)))
+                f.write(record)
+                offset += len(record)
+            entries.sort()
+            id_width = max((len(entry[0]) for entry in entries), default=0)
+            entry = struct.Struct('<{}sQI'.format(id_width))
+            f.write(b''.join(entry.pack(*e) for e in entries))
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, id_width, len(entries),
+                                offset))
+        os.replace(tmp_path, file_path)
+
+    def _entry_at(self, position: int) -> Tuple[bytes, int, int]:
+        """ Read the index entry at `position`
+        """
+        return self._entry.unpack_from(
+            self._mmap, self._index_offset + position * self._entry.size)
+
+    def _find(self, obj_id: str) -> Tuple[int, int]:
+        """ Binary search the index, return (offset, length) or None
+        """
+        key = obj_id.encode('utf-8')
+        if len(key) > self._id_width:
+            return None
+        key = key.ljust(self._id_width, b'\0')
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            entry_id, offset, length = self._entry_at(middle)
+            if entry_id < key:
+                low = middle + 1
+            elif entry_id > key:
+                high = middle
+            else:
+                return offset, length
+        return None
+
+    def get(self, obj_id: str) -> bytes:
+        """ Return the encoded record of `obj_id`, or None
+        """
+        found = self._find(obj_id)
+        if found is None:
+            return None
+        offset, length = found
+        return self._mmap[offset:offset + length]
+
+    def __contains__(self, obj_id: str) -> bool:
+        """ Whether `obj_id` is in the snapshot
+        """
+        return self._find(obj_id) is not None
+
+    def __len__(self) -> int:
+        """ Number of records
+        """
+        return self._count
+
+    def items(self) -> Iterator[Tuple[str, bytes]]:
+        """ Iterate over (id, encoded record) pairs in id order
+        """
+        for position in range(self._count):
+            entry_id, offset, length = self._entry_at(position)
+            yield (entry_id.rstrip(b'\0').decode('utf-8'),
+                   self._mmap[offset:offset + length])
+
+    def close(self):
+        """ Unmap the file
+        """
+        self._mmap.close()
+
+
+class SnapshotTable(MutableMapping):
+    """ Mapping of objects by ID backed by a snapshot
+
+    Reads fall through to the snapshot and return decoded records;
+    writes and deletions are kept in memory on top of it.
+    """
+
+    def __init__(self, snapshot: Snapshot, decode: Callable):
+        """ Overlay an empty set of changes on `snapshot`
+        """
+        self.snapshot = snapshot
+        self._decode = decode
+        self._overlay = {}
+        self._removed = set()
+        self._shadowed = 0
+
+    def __getitem__(self, obj_id: str):
+        """ Return the changed object or the decoded snapshot record
+        """
+        if obj_id in self._overlay:
+            return self._overlay[obj_id]
+        if obj_id in self._removed:
+            raise KeyError(obj_id)
+        record = self.snapshot.get(obj_id)
+        if record is None:
+            raise KeyError(obj_id)
+        return self._decode(record)
+
+    def __setitem__(self, obj_id: str, obj):
+        """ Store `obj` in the overlay
+        """
+        if obj_id not in self._overlay:
+            if obj_id in self._removed:
+                self._removed.discard(obj_id)
+                self._shadowed += 1
+            elif obj_id in self.snapshot:
+                self._shadowed += 1
+        self._overlay[obj_id] = obj
+
+    def __delitem__(self, obj_id: str):
+        """ Forget `obj_id`, hiding its snapshot record if any
+        """
+        if obj_id in self._overlay:
+            del self._overlay[obj_id]
+            if obj_id in self.snapshot:
+                self._shadowed -= 1
+                self._removed.add(obj_id)
+        elif obj_id not in self._removed and obj_id in self.snapshot:
+            self._removed.add(obj_id)
+        else:
+            raise KeyError(obj_id)
+
+    def __iter__(self) -> Iterator[str]:
+        """ Iterate over the IDs, changed objects first
+        """
+        for obj_id, _ in self.items():
+            yield obj_id
+
+    def __len__(self) -> int:
+        """ Number of objects
+        """
+        return (len(self.snapshot) - len(self._removed) - self._shadowed
+                + len(self._overlay))
+
+    def items(self) -> Iterator[tuple]:
+        """ Iterate over (id, object) pairs with a sequential scan
+
+        The overlay is copied up front and the snapshot is filtered
+        against that copy, so a record moved into the overlay during
+        the scan (e.g. by hydration under the read lock) is still
+        yielded once.
+        """
+        overlay = dict(self._overlay)
+        yield from overlay.items()
+        for obj_id, record in self.snapshot.items():
+            if obj_id not in overlay and obj_id not in self._removed:
+                yield obj_id, self._decode(record)
+
+    def values(self) -> Iterator:
+        """ Iterate over the objects with a sequential scan
+        """
+        for _, obj in self.items():
+            yield obj
+
+    def records(self, encode: Callable) -> Iterator[Tuple[str, bytes]]:
+        """ Iterate over (id, encoded record) pairs for Snapshot.write
+
+        Changed objects are passed through `encode`; the others are
+        copied from the snapshot without decoding them; as in `items`,
+        the snapshot is filtered against a copy of the overlay.
+        """
+        overlay = dict(self._overlay)
+        for obj_id, obj in overlay.items():
+            yield obj_id, encode(obj)
+        for obj_id, record in self.snapshot.items():
+            if obj_id not in overlay and obj_id not in self._removed:
+                yield obj_id, record
+
+
+def convert(json_path: str) -> str:
+    """ Convert a `.db_<Class>.json` file, return the snapshot path
+    """
+    with open(json_path, 'r') as f:
+        objs_json = json.load(f)
+    bin_path = os.path.splitext(json_path)[0] + '.bin'
+    Snapshot.write(bin_path, (
+        (obj_id, json.dumps(obj_json, separators=(',', ':')).encode('utf-8'))
+        for obj_id, obj_json in objs_json.items()))
+    return bin_path
+
+
+if __name__ == "__main__":
+    for json_path in sys.argv[1:]:
+        print("{} -> {}".format(json_path, convert(json_path)))
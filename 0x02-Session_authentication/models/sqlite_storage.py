@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+""" SQLite storage module
+
+One table per model class, with a column per stored attribute, the
+ID as primary key and an index on each of `indexed_attributes` and
+`sorted_attributes`. Timestamps are stored as ISO strings, which sort
+like the datetimes they stand for. The
+database runs in WAL mode so readers do not block the writer, and each
+thread gets its own connection.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from os import getenv
+from typing import Iterator, List, Tuple, TypeVar
+import itertools
+import sqlite3
+import threading
+
+from models.storage import Storage
+
+
+class SQLiteStorage(Storage):
+    """ Storage backend keeping every class in one SQLite database
+    """
+
+    def __init__(self, file_path: str = None):
+        """ Use the database at `file_path` (MODELS_SQLITE_PATH)
+        """
+        self.file_path = file_path or getenv('MODELS_SQLITE_PATH',
+                                             '.db.sqlite3')
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._tables = {}
+
+    def connection(self) -> sqlite3.Connection:
+        """ Return the connection of the current thread
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.file_path, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def columns(self, cls: type) -> tuple:
+        """ Return the columns of the table of `cls`, creating it
+        """
+        columns = self._tables.get(cls)
+        if columns is None:
+            with self._lock:
+                columns = self._tables.get(cls)
+                if columns is None:
+                    columns = cls.fields()
+                    table = cls.__name__
+                    self.connection().execute(
+                        'CREATE TABLE IF NOT EXISTS "{}" ({})'.format(
+                            table, ', '.join(
+                                '"{}" TEXT PRIMARY KEY'.format(column)
+                                if column == 'id' else '"{}"'.format(column)
+                                for column in columns)))
+                    for attribute in dict.fromkeys(
+                            cls.indexed_attributes + cls.sorted_attributes):
+                        self.connection().execute(
+                            'CREATE INDEX IF NOT EXISTS "{0}_{1}" '
+                            'ON "{0}" ("{1}")'.format(table, attribute))
+                    self._tables[cls] = columns
+        return columns
+
+    def load(self, cls: type):
+        """ Create the table of `cls` if needed
+        """
+        self.columns(cls)
+
+    def save(self, obj: TypeVar('Base')):
+        """ Insert or replace one object
+        """
+        cls = type(obj)
+        columns = self.columns(cls)
+        row = obj.to_json(True)
+        self.connection().execute(
+            'INSERT OR REPLACE INTO "{}" ({}) VALUES ({})'.format(
+                cls.__name__, ', '.join('"{}"'.format(c) for c in columns),
+                ', '.join('?' * len(columns))),
+            [row.get(column) for column in columns])
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Delete one object
+        """
+        cls = type(obj)
+        self.columns(cls)
+        self.connection().execute(
+            'DELETE FROM "{}" WHERE id = ?'.format(cls.__name__), (obj.id,))
+
+    def get(self, cls: type, obj_id: str) -> TypeVar('Base'):
+        """ Return one object by ID, or None
+        """
+        return next(self.select(cls, {'id': obj_id}), None)
+
+    def iter_search(self, cls: type, attributes: dict, cursor: str = None,
+                    limit: int = None) -> Iterator[TypeVar('Base')]:
+        """ Yield the objects whose attributes equal `attributes`
+
+        Attributes that are columns are matched in SQL; any other (e.g.
+        a property) is compared on the built objects, in which case the
+        limit is applied after that comparison.
+        """
+        columns = self.columns(cls)
+        where = {k: v for k, v in attributes.items() if k in columns}
+        rest = {k: v for k, v in attributes.items() if k not in columns}
+        objs = self.select(cls, where, cursor, None if rest else limit)
+        objs = (obj for obj in objs
+                if all(getattr(obj, k) == v for k, v in rest.items()))
+        if rest and limit is not None:
+            objs = itertools.islice(objs, limit)
+        yield from objs
+
+    def select(self, cls: type, where: dict, cursor: str = None,
+               limit: int = None) -> Iterator[TypeVar('Base')]:
+        """ Build the objects of the rows matching column equalities,
+        streaming them from the database cursor
+        """
+        columns = self.columns(cls)
+        clauses, params = [], []
+        for column, value in where.items():
+            if value is None:
+                clauses.append('"{}" IS NULL'.format(column))
+                continue
+            if type(value) is datetime:
+                value = value.isoformat(timespec='seconds')
+            clauses.append('"{}" = ?'.format(column))
+            params.append(value)
+        if cursor is not None:
+            clauses.append('id > ?')
+            params.append(cursor)
+        query = 'SELECT {} FROM "{}"'.format(
+            ', '.join('"{}"'.format(c) for c in columns), cls.__name__)
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        if limit is not None:
+            query += ' ORDER BY id LIMIT ?'
+            params.append(limit)
+        for row in self.connection().execute(query, params):
+            yield cls(**dict(zip(columns, row)))
+
+    def query(self, cls: type, conditions: List[tuple], order_by: str = None,
+              limit: int = None) -> List[TypeVar('Base')]:
+        """ Return the objects meeting every condition
+
+        Conditions and orders on columns are run in SQL, a prefix as a
+        range so the column index serves it; any other is applied to the
+        built objects, and the limit after it.
+        """
+        columns = self.columns(cls)
+        rest = [c for c in conditions if c[0] not in columns]
+        clauses, params = [], []
+        for attribute, op, operand in conditions:
+            if attribute in columns:
+                clause, values = self.condition(attribute, op, operand)
+                clauses.append(clause)
+                params.extend(values)
+        query = 'SELECT {} FROM "{}"'.format(
+            ', '.join('"{}"'.format(c) for c in columns), cls.__name__)
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        reverse = order_by is not None and order_by.startswith('-')
+        attribute = order_by.lstrip('-') if order_by else None
+        if attribute in columns:
+            query += ' ORDER BY "{0}" {1}, id {1}'.format(
+                attribute, 'DESC' if reverse else 'ASC')
+        sql_limit = not rest and (attribute is None or attribute in columns)
+        if limit is not None and sql_limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        objs = (cls(**dict(zip(columns, row)))
+                for row in self.connection().execute(query, params))
+        if rest:
+            objs = (obj for obj in objs if cls.matches(obj, rest))
+        if attribute is not None and attribute not in columns:
+            def key(obj: TypeVar('Base')) -> tuple:
+                value = getattr(obj, attribute, None)
+                return (value is not None, value, obj.id)
+
+            objs = sorted(objs, key=key, reverse=reverse)
+        if limit is not None and not sql_limit:
+            objs = itertools.islice(objs, limit)
+        return list(objs)
+
+    @staticmethod
+    def condition(column: str, op: str, operand) -> Tuple[str, list]:
+        """ Return the SQL clause and parameters of one condition
+        """
+        def value(operand):
+            if type(operand) is datetime:
+                return operand.isoformat(timespec='seconds')
+            return operand
+
+        if op == 'in':
+            values = [value(v) for v in operand if v is not None]
+            clauses = ['"{}" IN ({})'.format(column, ', '.join(
+                '?' * len(values)))] if values else []
+            if len(values) < len(operand):
+                clauses.append('"{}" IS NULL'.format(column))
+            return '({})'.format(' OR '.join(clauses) or '0'), values
+        if operand is None:
+            if op in ('eq', 'ne'):
+                return '"{}" IS {}NULL'.format(
+                    column, 'NOT ' if op == 'ne' else ''), []
+            return '0', []
+        operand = value(operand)
+        if op == 'ne':
+            return '("{0}" != ? OR "{0}" IS NULL)'.format(column), [operand]
+        if op == 'startswith':
+            if type(operand) is not str:
+                return '0', []
+            if not operand or ord(operand[-1]) == 0x10ffff:
+                return 'substr("{0}", 1, ?) = ? AND typeof("{0}") = ?'.format(
+                    column), [len(operand), operand, 'text']
+            return '("{0}" >= ? AND "{0}" < ?)'.format(column), \
+                [operand, operand[:-1] + chr(ord(operand[-1]) + 1)]
+        return '"{}" {} ?'.format(column, {
+            'eq': '=', 'lt': '<', 'lte': '<=', 'gt': '>', 'gte': '>='}[op]), \
+            [operand]
+
+    def count(self, cls: type) -> int:
+        """ Count the objects of `cls`
+        """
+        self.columns(cls)
+        return self.connection().execute(
+            'SELECT COUNT(*) FROM "{}"'.format(cls.__name__)).fetchone()[0]
+
+    @contextmanager
+    def transaction(self):
+        """ Run the block in one SQLite transaction of this thread
+
+        Like the JSON store, what was applied is committed even if the
+        block raises.
+        """
+        conn = self.connection()
+        if conn.in_transaction:
+            yield
+            return
+        conn.execute('BEGIN')
+        try:
+            yield
+        finally:
+            conn.execute('COMMIT')
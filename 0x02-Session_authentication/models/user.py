@@ -9,6 +9,10 @@ class User(Base):
     """ User class
     """
 
+    __slots__ = ('email', '_password', 'first_name', 'last_name')
+    indexed_attributes = ('email',)
+    sorted_attributes = ('created_at', 'updated_at', 'email')
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance
         """
@@ -13,6 +13,9 @@ class UserSession(Base):
         session_id (str): The unique identifier for the session.
     """
 
+    __slots__ = ('user_id', 'session_id')
+    indexed_attributes = ('session_id',)
+
     def __init__(self, *args: list, **kwargs: dict):
         """
         Method initialize a UserSession's instance.
@@ -23,6 +26,7 @@ class UserSession(Base):
                 user_id (str): The user ID associated with the session.
                 session_id (str): The unique identifier for the session.
         """
+        super().__init__(*args, **kwargs)
         # Extract values from positional arguments if available
         if args:
             self.user_id = args[0]
@@ -8,6 +8,7 @@ from sqlalchemy.orm.exc import NoResultFound
 from typing import Optional, TypeVar, Union
 
 from db import DB
+from password_executor import get_executor
 from user import User
 
 Obj = TypeVar(User)
@@ -22,9 +23,10 @@ def _hash_password(password: str) -> bytes:
     Returns:
         bytes: Salted hash of the input password.
     """
-    # Generate a random salt and hash the password
+    # Generate a random salt and hash the password on the shared pool
     salt = bcrypt.gensalt()
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
+    hashed_password = get_executor().submit(
+        bcrypt.hashpw, password.encode('utf-8'), salt).result()
 
     return hashed_password
 
@@ -95,7 +97,8 @@ class Auth:
             user = self._db.find_user_by(email=email)
             hashed_password = user.hashed_password
             encoded_password = password.encode("utf-8")
-            return bcrypt.checkpw(encoded_password, hashed_password)
+            return get_executor().submit(
+                bcrypt.checkpw, encoded_password, hashed_password).result()
 
         except NoResultFound:
             # Return False if no user is found with the specified email
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+This module runs password hashing and verification on a shared,
+bounded thread pool.
+
+Bcrypt releases the GIL while it hashes, so offloading it to a small
+pool keeps request threads free while capping how many CPU cores
+password work may use at once.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+MAX_WORKERS = int(os.getenv("PASSWORD_MAX_WORKERS", os.cpu_count() or 1))
+MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", 4 * MAX_WORKERS))
+
+
+class PasswordExecutor:
+    """
+    Bounded thread pool for CPU-heavy password operations.
+
+    At most max_workers operations run at once and at most max_pending
+    are accepted (queued or running); further submissions wait for a
+    free slot. Queue wait time and run time are recorded separately.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS,
+                 max_pending: int = MAX_PENDING):
+        """
+        Initializes the executor.
+
+        Args:
+            max_workers (int): The number of operations run concurrently.
+            max_pending (int): The number of operations accepted at once.
+        """
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self._pool = ThreadPoolExecutor(max_workers,
+                                        thread_name_prefix="password")
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._tasks = 0
+        self._wait_time = 0.0
+        self._run_time = 0.0
+        self._max_wait_time = 0.0
+
+    def submit(self, fn: Callable, *args: Any) -> Future:
+        """
+        Schedules a password operation, waiting for a free slot.
+
+        Args:
+            fn (Callable): The operation, e.g. bcrypt.checkpw.
+            *args (Any): The arguments of the operation.
+
+        Returns:
+            Future: The future result of the operation.
+        """
+        self._slots.acquire()
+        return self._submit(fn, args)
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """
+        Runs a password operation without blocking the event loop.
+
+        Args:
+            fn (Callable): The operation, e.g. bcrypt.checkpw.
+            *args (Any): The arguments of the operation.
+
+        Returns:
+            Any: The result of the operation.
+        """
+        loop = asyncio.get_running_loop()
+        if not self._slots.acquire(blocking=False):
+            acquiring = loop.run_in_executor(None, self._slots.acquire)
+            try:
+                await asyncio.shield(acquiring)
+            except asyncio.CancelledError:
+                acquiring.add_done_callback(self._release_acquired)
+                raise
+        return await asyncio.wrap_future(self._submit(fn, args), loop=loop)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the queue wait and run time metrics.
+
+        Returns:
+            Dict[str, float]: The completed task count, average and
+            maximum queue wait and average run time, in seconds.
+        """
+        with self._lock:
+            tasks = self._tasks or 1
+            return {
+                "tasks": self._tasks,
+                "avg_wait_time": self._wait_time / tasks,
+                "max_wait_time": self._max_wait_time,
+                "avg_run_time": self._run_time / tasks,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the worker threads.
+
+        Args:
+            wait (bool): Whether to wait for pending operations.
+        """
+        self._pool.shutdown(wait)
+
+    def _submit(self, fn: Callable, args: tuple) -> Future:
+        """
+        Hands an operation to the pool once a slot has been taken.
+
+        The slot is given back when the future is done, which also
+        covers a future cancelled before a worker picked it up.
+
+        Args:
+            fn (Callable): The operation.
+            args (tuple): The arguments of the operation.
+
+        Returns:
+            Future: The future result of the operation.
+        """
+        try:
+            future = self._pool.submit(self._call, fn, args,
+                                       time.perf_counter())
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future: Future) -> None:
+        """
+        Gives back the slot of a finished or cancelled operation.
+
+        Args:
+            future (Future): The future of the operation.
+        """
+        self._slots.release()
+
+    def _release_acquired(self, acquiring: asyncio.Future) -> None:
+        """
+        Gives back a slot acquired for a run() that was cancelled.
+
+        Args:
+            acquiring (asyncio.Future): The future of the slot acquire.
+        """
+        if not acquiring.cancelled() and acquiring.exception() is None:
+            self._slots.release()
+
+    def _call(self, fn: Callable, args: tuple, queued_at: float) -> Any:
+        """
+        Runs an operation on a worker thread and records its timings.
+
+        Args:
+            fn (Callable): The operation.
+            args (tuple): The arguments of the operation.
+            queued_at (float): When the operation was submitted.
+
+        Returns:
+            Any: The result of the operation.
+        """
+        started_at = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            ended_at = time.perf_counter()
+            with self._lock:
+                self._tasks += 1
+                self._wait_time += started_at - queued_at
+                self._max_wait_time = max(self._max_wait_time,
+                                          started_at - queued_at)
+                self._run_time += ended_at - started_at
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> PasswordExecutor:
+    """
+    Returns the process-wide password executor, creating it if needed.
+
+    Returns:
+        PasswordExecutor: The shared executor.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = PasswordExecutor()
+    return _executor